@@ -9,11 +9,8 @@ import sys
 from pathlib import Path
 from datetime import datetime
 from src.config_loader import load_config
-from src.spec_parser import SpecParser
-from src.ai_analyzer import AIAnalyzer
+from src.spec_parser import SpecParser, load_spec_cached
 from src.test_generator import TestGenerator
-from src.test_executor import TestExecutor
-from src.reporter import Reporter
 from src.utils import setup_logging, print_banner
 
 def main():
@@ -60,6 +57,12 @@ Examples:
         help='Output directory for reports (default: reports/)'
     )
     
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Ignore cached spec parses and AI analyses'
+    )
+    
     parser.add_argument(
         '--verbose',
         action='store_true',
@@ -82,14 +85,27 @@ Examples:
         
         # Step 2: Parse OpenAPI spec
         logger.info(f"Parsing OpenAPI specification: {args.spec}")
-        spec_parser = SpecParser(args.spec)
-        spec_data = spec_parser.parse()
+        advanced = config.get('advanced', {})
+        cache_root = Path(advanced.get('cache_directory', '.cache'))
+        if args.no_cache:
+            spec_data = SpecParser(args.spec).parse()
+        else:
+            spec_data = load_spec_cached(args.spec, cache_dir=str(cache_root / 'spec'))
         logger.info(f"✓ Parsed {len(spec_data['endpoints'])} endpoints from spec")
         
         # Step 3: AI Analysis
         logger.info("Analyzing API with AI...")
-        ai_analyzer = AIAnalyzer(config['ai'])
-        analysis = ai_analyzer.analyze_spec(spec_data)
+        from src.ai_analyzer import AIAnalyzer
+        use_ai_cache = advanced.get('cache_ai_responses', False) and not args.no_cache
+        ai_analyzer = AIAnalyzer(
+            config['ai'],
+            cache_dir=str(cache_root / 'ai_analysis') if use_ai_cache else None
+        )
+        if config['ai'].get('use_async', False):
+            import asyncio
+            analysis = asyncio.run(ai_analyzer.analyze_spec_async(spec_data))
+        else:
+            analysis = ai_analyzer.analyze_spec(spec_data)
         logger.info(f"✓ AI generated test strategy for {len(analysis['test_scenarios'])} scenarios")
         
         # Step 4: Generate test code
@@ -103,7 +119,10 @@ Examples:
             logger.info(f"Generated tests are in: {Path('generated_tests').absolute()}")
             return 0
         
-        # Step 5: Execute tests
+        # Step 5: Execute tests (executor/reporter imported only when needed)
+        from src.test_executor import TestExecutor
+        from src.reporter import Reporter
+
         logger.info("Executing test suite...")
         executor = TestExecutor(config['execution'])
         test_results = executor.run_tests(test_files, config['api'])
@@ -113,36 +132,42 @@ Examples:
         
         # Step 6: Generate report
         logger.info("Generating test report...")
-        reporter = Reporter(config['reporting'])
+        with Reporter(
+            config['reporting'],
+            cache_dir=None if args.no_cache else str(cache_root / 'jinja')
+        ) as reporter:
 
-        # Pass analysis data for accurate test categorization
-        reporter._analysis_data = analysis  # ← ADD THIS LINE
+            # Pass analysis data for accurate test categorization
+            reporter._analysis_data = analysis  # ← ADD THIS LINE
 
-        report_path = reporter.generate_report(
-            spec_data=spec_data,
-            test_results=test_results,
-            analysis=analysis,
-            output_dir=args.output_dir
-        )
-        logger.info(f"✓ Report generated: {report_path}")
+            report_path = reporter.generate_report(
+                spec_data=spec_data,
+                test_results=test_results,
+                analysis=analysis,
+                output_dir=args.output_dir
+            )
+            logger.info(f"✓ Report generated: {report_path}")
+            
+            # Step 7: Send email if configured
+            if config['reporting'].get('email', {}).get('enabled'):
+                logger.info("Sending email report...")
+                reporter.send_email_report(report_path, test_results)
+                logger.info("✓ Email sent successfully")
         
-        # Step 7: Send email if configured
-        if config['reporting'].get('email', {}).get('enabled'):
-            logger.info("Sending email report...")
-            reporter.send_email_report(report_path, test_results)
-            logger.info("✓ Email sent successfully")
-        
-        # Summary
-        print("\n" + "="*70)
-        print("🎉 TEST EXECUTION COMPLETE")
-        print("="*70)
-        print(f"Total Tests:     {test_results['total_tests']}")  # ← Make sure this is from test_results
-        print(f"Passed:          {test_results['passed']} ({test_results['pass_rate']:.1f}%)")
-        print(f"Failed:          {test_results['failed']}")
-        print(f"Skipped:         {test_results.get('skipped', 0)}")
-        print(f"Duration:        {test_results['duration']:.2f}s")
-        print(f"\nReport:          {report_path}")
-        print("="*70 + "\n")
+        # Summary (written in one call so it isn't interleaved with log output)
+        rule = "=" * 70
+        sys.stdout.write(
+            f"\n{rule}\n"
+            f"🎉 TEST EXECUTION COMPLETE\n"
+            f"{rule}\n"
+            f"Total Tests:     {test_results['total_tests']}\n"
+            f"Passed:          {test_results['passed']} ({test_results['pass_rate']:.1f}%)\n"
+            f"Failed:          {test_results['failed']}\n"
+            f"Skipped:         {test_results.get('skipped', 0)}\n"
+            f"Duration:        {test_results['duration']:.2f}s\n"
+            f"\nReport:          {report_path}\n"
+            f"{rule}\n\n"
+        )
         
         # Exit code based on test results
         return 0 if test_results['failed'] == 0 else 1
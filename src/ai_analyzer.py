@@ -2,21 +2,109 @@
 AI Analyzer - Uses LLMs to analyze API specs and generate test strategies
 """
 
+import asyncio
+import hashlib
 import json
 import logging
-from typing import Dict, List, Any
-from anthropic import Anthropic
+import random
+import re
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, ClassVar, Dict, List, Optional, Tuple
 import os
 
+from .utils import (
+    CACHE_SUFFIX,
+    RateLimiter,
+    atomic_write_bytes,
+    compress_bytes,
+    decompress_bytes,
+    json_dumps,
+    json_loads,
+)
+
 logger = logging.getLogger(__name__)
 
+# A string value followed on the next line by another string, with no comma between
+_MISSING_COMMA = re.compile(r'"\s*\n\s*"')
+
+# Path separators become underscores and template braces are dropped in test names
+_NAME_TABLE = str.maketrans({'/': '_', '{': None, '}': None})
+
 
 class AIAnalyzer:
     """AI-powered API analysis and test strategy generation"""
     
-    def __init__(self, config: Dict):
-        """Initialize AI analyzer with configuration"""
+    # Static prompt text; only the summary and counts are filled in per call
+    # (literal braces are doubled for str.format_map)
+    _PROMPT_TEMPLATE: ClassVar[str] = """You are an expert QA engineer analyzing an API specification to create a comprehensive test strategy.
+
+API Specification Summary:
+{summary}
+
+Generate test scenarios for this API. For EACH of the {n} endpoints, create EXACTLY {per} test scenarios:
+1. One positive test (valid request, expected 200/201)
+2. One negative test (invalid input, expected 400/422)
+3. One edge case (boundary values, null, empty strings)
+4. One security test (authentication, authorization, or injection prevention)
+
+This means you should generate {total} total test scenarios.
+
+CRITICAL: Return ONLY valid JSON. Do NOT use JavaScript code like .repeat() or template literals.
+Use actual values in test_data, not code expressions.
+
+CORRECT example:
+{{"test_data": {{"parameters": {{}}, "body": {{"title": "Test Post", "body": "Test content", "userId": 1}}}}}}
+
+WRONG example (DO NOT DO THIS):
+{{"test_data": {{"body": {{"title": "A".repeat(1000)}}}}}}
+
+Return JSON with this EXACT structure:
+{{
+  "overall_strategy": "Brief test strategy overview",
+  "test_scenarios": [
+    {{
+      "endpoint": "POST /posts",
+      "test_type": "positive",
+      "scenario_name": "Test creating valid post",
+      "description": "Validates successful post creation",
+      "priority": "high",
+      "test_data": {{
+        "parameters": {{}},
+        "body": {{"title": "Sample Post", "body": "Sample content", "userId": 1}}
+      }},
+      "expected_status": 201,
+      "assertions": ["Check response schema", "Verify post ID returned"]
+    }}
+  ],
+  "risk_areas": ["Authentication bypass", "Input validation"],
+  "coverage_gaps": ["Performance testing"]
+}}
+
+For JSONPlaceholder API specifically:
+- Use user IDs 1-10 (these exist)
+- Use post IDs 1-100 (these exist)
+- Positive tests should use ID 1 or 2
+
+Rules:
+1. Return ONLY the JSON object - no text before or after
+2. Use actual string/number values, not JavaScript expressions
+3. Ensure all JSON arrays have proper comma separators
+4. Test types: "positive", "negative", "edge_case", or "security"
+5. Generate all {total} scenarios"""
+    
+    def __init__(self, config: Dict, cache_dir: Optional[str] = None):
+        """
+        Initialize AI analyzer with configuration
+        
+        Args:
+            config: AI configuration section
+            cache_dir: Directory for cached analyses (None disables caching)
+        """
         self.config = config
+        self.cache_dir = Path(cache_dir) if cache_dir else None
         
         # Validate required fields
         required_fields = ['provider', 'model', 'api_key_env', 'temperature', 'max_tokens']
@@ -30,14 +118,43 @@ class AIAnalyzer:
         test_gen_config = config.get('test_generation', {})
         self.tests_per_endpoint = test_gen_config.get('tests_per_endpoint', 4)
         
-        # Initialize AI client
-        if self.provider == 'anthropic':
-            api_key = os.getenv(config['api_key_env'])
+        # Large specs are split into several prompts sent concurrently
+        self.endpoints_per_prompt = max(1, config.get('endpoints_per_prompt', 10))
+        self.max_concurrency = max(1, config.get('max_concurrency', 5))
+        
+        # Proactive throttling to stay under provider limits
+        self._rate_limiter = RateLimiter(
+            rpm=config.get('rpm', 50),
+            tpm=config.get('tpm', 80_000)
+        )
+        
+        # Retries are owned here (rate-limit aware backoff) rather than by the SDK
+        self.max_retries = config.get('max_retries', 5)
+        self.timeout = config.get('timeout', 120.0)
+        
+        # Built prompts keyed by id(spec_data); the spec is kept to guard against id reuse.
+        # Holds only the current analyze_spec call's chunks (cleared at the start of each call)
+        self._prompt_cache: Dict[int, tuple] = {}
+        
+        # Offline mode only serves cached analyses and never creates a client
+        self.offline = config.get('offline', False)
+        
+        # Initialize AI client (the async client is created on first analyze_spec_async)
+        self._api_key: Optional[str] = None
+        self._async_client = None
+        if self.offline:
+            self.client = None
+        elif self.provider == 'anthropic':
+            api_key = os.environ.get(config['api_key_env'])
             if not api_key:
                 raise ValueError(f"API key not found in environment variable: {config['api_key_env']}")
+            self._api_key = api_key
+            # Imported lazily: the SDK is slow to import and not needed for --help
+            from anthropic import Anthropic
             self.client = Anthropic(
                 api_key=api_key,
-                timeout=120.0
+                timeout=self.timeout,
+                max_retries=0
             )
         else:
             raise ValueError(f"Unsupported AI provider: {self.provider}")
@@ -54,34 +171,182 @@ class AIAnalyzer:
         """
         logger.info("Starting AI analysis of API specification...")
         
-        # Build analysis prompt
-        prompt = self._build_analysis_prompt(spec_data)
+        chunks, cache_file, cached = self._begin_analysis(spec_data)
+        if cached is not None:
+            return cached
         
-        # Get AI response
-        response = self._call_ai(prompt)
+        if len(chunks) == 1:
+            analyses = [self._analyze_chunk(chunks[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(chunks))) as pool:
+                analyses = list(pool.map(self._analyze_chunk, chunks))
+        
+        return self._finish_analysis(analyses, spec_data, cache_file)
+    
+    async def analyze_spec_async(self, spec_data: Dict) -> Dict[str, Any]:
+        """
+        Async variant of analyze_spec: chunks are sent concurrently on one event loop
+        
+        Args:
+            spec_data: Parsed OpenAPI specification
+            
+        Returns:
+            Dictionary containing test scenarios and strategy
+        """
+        logger.info("Starting AI analysis of API specification (async)...")
         
-        # Parse response into structured format
-        analysis = self._parse_analysis_response(response, spec_data)
+        chunks, cache_file, cached = self._begin_analysis(spec_data)
+        if cached is not None:
+            return cached
+        
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def analyze_chunk(chunk_spec: Dict) -> Dict[str, Any]:
+            prompt = self._build_analysis_prompt(chunk_spec)
+            async with semaphore:
+                response = await self._call_ai_async(prompt)
+            return self._parse_analysis_response(response, chunk_spec)
+        
+        analyses = await asyncio.gather(*(analyze_chunk(chunk) for chunk in chunks))
+        return self._finish_analysis(list(analyses), spec_data, cache_file)
+    
+    def _begin_analysis(self, spec_data: Dict) -> Tuple[List[Dict], Optional[Path], Optional[Dict[str, Any]]]:
+        """
+        Shared start of analyze_spec/analyze_spec_async: chunk the spec and check the cache
+        
+        Returns:
+            (chunks, cache file, cached analysis or None)
+            
+        Raises:
+            ValueError: Offline mode and no cached analysis
+        """
+        # Chunks are rebuilt per call, so earlier prompts can never hit again
+        self._prompt_cache.clear()
+        chunks = self._chunk_spec(spec_data)
+        
+        cache_file = self._analysis_cache_file(chunks)
+        cached = self._load_cached_analysis(cache_file)
+        if cached is None:
+            if self.offline:
+                raise ValueError("Offline mode: no cached AI analysis found for this spec "
+                                 "(run once online with advanced.cache_ai_responses enabled)")
+            if len(chunks) > 1:
+                logger.info(f"Splitting {len(spec_data['endpoints'])} endpoints into {len(chunks)} prompts "
+                           f"(up to {self.max_concurrency} concurrent)")
+        
+        return chunks, cache_file, cached
+    
+    def _finish_analysis(self, analyses: List[Dict], spec_data: Dict,
+                         cache_file: Optional[Path]) -> Dict[str, Any]:
+        """Shared end of analyze_spec/analyze_spec_async: merge chunk results and cache them"""
+        analysis = self._merge_analyses(analyses, spec_data)
+        self._store_cached_analysis(cache_file, analysis)
         
         logger.info(f"AI analysis complete: {len(analysis['test_scenarios'])} scenarios identified")
         
         return analysis
     
+    def _analysis_cache_file(self, chunks: List[Dict]) -> Optional[Path]:
+        """Cache path for these chunks: the AI output depends only on prompts + model settings"""
+        if self.cache_dir is None:
+            return None
+        
+        digest = hashlib.blake2b()
+        digest.update(f"{self.config['model']}|{self.config['temperature']}|{self.config['max_tokens']}".encode('utf-8'))
+        for chunk in chunks:
+            digest.update(b'\0')
+            digest.update(self._build_analysis_prompt(chunk).encode('utf-8'))
+        
+        return self.cache_dir / f"{digest.hexdigest()}.json{CACHE_SUFFIX}"
+    
+    def _load_cached_analysis(self, cache_file: Optional[Path]) -> Optional[Dict[str, Any]]:
+        """Return a previously stored analysis, or None on miss"""
+        if cache_file is None or not cache_file.exists():
+            return None
+        
+        try:
+            analysis = json_loads(decompress_bytes(cache_file.read_bytes()))
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable analysis cache {cache_file}: {e}")
+            return None
+        
+        logger.info(f"Using cached AI analysis ({len(analysis['test_scenarios'])} scenarios) from {cache_file}")
+        return analysis
+    
+    def _store_cached_analysis(self, cache_file: Optional[Path], analysis: Dict[str, Any]):
+        """Persist analysis; fallback results are not cached so the next run retries the AI"""
+        if cache_file is None or analysis.get('fallback'):
+            return
+        
+        try:
+            atomic_write_bytes(cache_file, compress_bytes(json_dumps(analysis).encode('utf-8')))
+            logger.debug(f"Cached AI analysis: {cache_file}")
+        except OSError as e:
+            logger.warning(f"Failed to write analysis cache: {e}")
+    
+    def _chunk_spec(self, spec_data: Dict) -> List[Dict]:
+        """Split spec into sub-specs of at most endpoints_per_prompt endpoints"""
+        endpoints = spec_data['endpoints']
+        size = self.endpoints_per_prompt
+        
+        if len(endpoints) <= size:
+            return [spec_data]
+        
+        return [
+            dict(spec_data, endpoints=endpoints[i:i + size])
+            for i in range(0, len(endpoints), size)
+        ]
+    
+    def _analyze_chunk(self, spec_data: Dict) -> Dict[str, Any]:
+        """Build prompt, call AI and parse the response for one (sub-)spec"""
+        prompt = self._build_analysis_prompt(spec_data)
+        response = self._call_ai(prompt)
+        return self._parse_analysis_response(response, spec_data)
+    
+    def _merge_analyses(self, analyses: List[Dict], spec_data: Dict) -> Dict[str, Any]:
+        """Combine per-chunk analyses into a single analysis for the full spec"""
+        if len(analyses) == 1:
+            return analyses[0]
+        
+        test_scenarios = [s for a in analyses for s in a['test_scenarios']]
+        
+        return {
+            'overall_strategy': analyses[0].get('overall_strategy', ''),
+            'test_scenarios': test_scenarios,
+            # dict.fromkeys dedups while keeping first-seen order
+            'risk_areas': list(dict.fromkeys(r for a in analyses for r in a.get('risk_areas', []))),
+            'coverage_gaps': list(dict.fromkeys(g for a in analyses for g in a.get('coverage_gaps', []))),
+            'api_info': spec_data['info'],
+            'total_endpoints': len(spec_data['endpoints']),
+            'total_scenarios': len(test_scenarios),
+            'coverage_percentage': self._coverage_percentage(test_scenarios, spec_data),
+            'fallback': any(a.get('fallback', False) for a in analyses)
+        }
+    
+    def _coverage_percentage(self, test_scenarios: List[Dict], spec_data: Dict) -> float:
+        """Percentage of spec endpoints with at least one scenario"""
+        covered_endpoints = {scenario['endpoint'] for scenario in test_scenarios}
+        
+        return (
+            len(covered_endpoints) / len(spec_data['endpoints']) * 100
+            if spec_data['endpoints'] else 0
+        )
+    
     def _build_analysis_prompt(self, spec_data: Dict) -> str:
         """Build the prompt for AI analysis"""
         
-        # Create a simplified version of spec for the prompt
-        api_summary = {
-            'title': spec_data['info']['title'],
-            'version': spec_data['info']['version'],
-            'description': spec_data['info']['description'],
-            'base_url': spec_data['servers'][0]['url'] if spec_data['servers'] else 'unknown',
-            'endpoints': []
-        }
+        # Prompts are deterministic per spec, reuse one built earlier for this object
+        cached = self._prompt_cache.get(id(spec_data))
+        if cached is not None and cached[0] is spec_data:
+            return cached[1]
         
-        # Simplify endpoints for prompt
+        # Create a simplified version of spec for the prompt (single pass, minimal fields)
+        info = spec_data['info']
+        servers = spec_data['servers']
+        endpoints = []
+        append = endpoints.append
         for endpoint in spec_data['endpoints']:
-            api_summary['endpoints'].append({
+            append({
                 'path': endpoint['path'],
                 'method': endpoint['method'],
                 'summary': endpoint['summary'],
@@ -95,70 +360,30 @@ class AIAnalyzer:
                     for p in endpoint['parameters']
                 ],
                 'request_body': endpoint['request_body'] is not None,
-                'responses': list(endpoint['responses'].keys())
+                'responses': list(endpoint['responses'])
             })
         
+        api_summary = {
+            'title': info['title'],
+            'version': info['version'],
+            'description': info['description'],
+            'base_url': servers[0]['url'] if servers else 'unknown',
+            'endpoints': endpoints
+        }
+        
         # Calculate total tests based on config
         num_endpoints = len(api_summary['endpoints'])
         total_tests = num_endpoints * self.tests_per_endpoint
         
         # Build prompt with tests_per_endpoint from config
-        prompt = f"""You are an expert QA engineer analyzing an API specification to create a comprehensive test strategy.
-
-API Specification Summary:
-{json.dumps(api_summary, indent=2)}
-
-Generate test scenarios for this API. For EACH of the {num_endpoints} endpoints, create EXACTLY {self.tests_per_endpoint} test scenarios:
-1. One positive test (valid request, expected 200/201)
-2. One negative test (invalid input, expected 400/422)
-3. One edge case (boundary values, null, empty strings)
-4. One security test (authentication, authorization, or injection prevention)
-
-This means you should generate {total_tests} total test scenarios.
-
-CRITICAL: Return ONLY valid JSON. Do NOT use JavaScript code like .repeat() or template literals.
-Use actual values in test_data, not code expressions.
-
-CORRECT example:
-{{"test_data": {{"parameters": {{}}, "body": {{"title": "Test Post", "body": "Test content", "userId": 1}}}}}}
-
-WRONG example (DO NOT DO THIS):
-{{"test_data": {{"body": {{"title": "A".repeat(1000)}}}}}}
-
-Return JSON with this EXACT structure:
-{{
-  "overall_strategy": "Brief test strategy overview",
-  "test_scenarios": [
-    {{
-      "endpoint": "POST /posts",
-      "test_type": "positive",
-      "scenario_name": "Test creating valid post",
-      "description": "Validates successful post creation",
-      "priority": "high",
-      "test_data": {{
-        "parameters": {{}},
-        "body": {{"title": "Sample Post", "body": "Sample content", "userId": 1}}
-      }},
-      "expected_status": 201,
-      "assertions": ["Check response schema", "Verify post ID returned"]
-    }}
-  ],
-  "risk_areas": ["Authentication bypass", "Input validation"],
-  "coverage_gaps": ["Performance testing"]
-}}
-
-For JSONPlaceholder API specifically:
-- Use user IDs 1-10 (these exist)
-- Use post IDs 1-100 (these exist)
-- Positive tests should use ID 1 or 2
-
-Rules:
-1. Return ONLY the JSON object - no text before or after
-2. Use actual string/number values, not JavaScript expressions
-3. Ensure all JSON arrays have proper comma separators
-4. Test types: "positive", "negative", "edge_case", or "security"
-5. Generate all {total_tests} scenarios"""
+        prompt = self._PROMPT_TEMPLATE.format_map({
+            'summary': json_dumps(api_summary),
+            'n': num_endpoints,
+            'per': self.tests_per_endpoint,
+            'total': total_tests
+        })
 
+        self._prompt_cache[id(spec_data)] = (spec_data, prompt)
         return prompt
 
     def _call_ai(self, prompt: str) -> str:
@@ -166,23 +391,133 @@ Rules:
         
         logger.debug("Calling AI API...")
         
-        try:
-            if self.provider == 'anthropic':
-                # NO DEFAULTS - all values must be in config
-                response = self.client.messages.create(
-                    model=self.config['model'],
-                    max_tokens=self.config['max_tokens'],
-                    temperature=self.config['temperature'],
-                    messages=[
-                        {"role": "user", "content": prompt}
-                    ]
-                )
+        attempt = 0
+        while True:
+            self._rate_limiter.acquire(tokens=self._estimate_tokens(prompt))
+            
+            try:
+                if self.provider == 'anthropic':
+                    # Streamed so progress is visible and Ctrl+C aborts the upstream request
+                    with self.client.messages.stream(**self._message_params(prompt)) as stream:
+                        parts = []
+                        for text in stream.text_stream:
+                            parts.append(text)
+                            self._log_stream_progress(parts)
+                        
+                        self._check_stop_reason(stream.get_final_message())
+                    
+                    return ''.join(parts)
                 
-                return response.content[0].text
+            except Exception as e:
+                delay = self._next_retry_delay(attempt, e)
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+    
+    async def _call_ai_async(self, prompt: str) -> str:
+        """Async variant of _call_ai"""
+        
+        logger.debug("Calling AI API (async)...")
+        
+        client = self._get_async_client()
+        
+        attempt = 0
+        while True:
+            await self._rate_limiter.acquire_async(tokens=self._estimate_tokens(prompt))
             
-        except Exception as e:
-            logger.error(f"AI API call failed: {e}")
-            raise
+            try:
+                if self.provider == 'anthropic':
+                    async with client.messages.stream(**self._message_params(prompt)) as stream:
+                        parts = []
+                        async for text in stream.text_stream:
+                            parts.append(text)
+                            self._log_stream_progress(parts)
+                        
+                        self._check_stop_reason(await stream.get_final_message())
+                    
+                    return ''.join(parts)
+                
+            except Exception as e:
+                delay = self._next_retry_delay(attempt, e)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+    
+    def _get_async_client(self):
+        """AsyncAnthropic client, created on first use so sync-only runs never build one"""
+        if self._async_client is None:
+            if self._api_key is None:
+                raise ValueError("AI client unavailable in offline mode")
+            from anthropic import AsyncAnthropic
+            self._async_client = AsyncAnthropic(
+                api_key=self._api_key,
+                timeout=self.timeout,
+                max_retries=0
+            )
+        return self._async_client
+    
+    def _estimate_tokens(self, prompt: str) -> int:
+        """Rough rate-limit cost: ~4 characters per input token, plus the full output budget"""
+        return len(prompt) // 4 + self.config['max_tokens']
+    
+    def _message_params(self, prompt: str) -> Dict[str, Any]:
+        """Request parameters shared by the sync and async clients"""
+        # NO DEFAULTS - all values must be in config
+        return {
+            'model': self.config['model'],
+            'max_tokens': self.config['max_tokens'],
+            'temperature': self.config['temperature'],
+            'messages': [
+                {"role": "user", "content": prompt}
+            ]
+        }
+    
+    def _next_retry_delay(self, attempt: int, error: Exception) -> Optional[float]:
+        """Delay before retrying a failed call, or None when the error should be raised"""
+        if attempt < self.max_retries and self._is_retryable(error):
+            delay = self._retry_delay(attempt, error)
+            logger.warning(f"AI API call failed ({type(error).__name__}), retrying in {delay:.1f}s "
+                          f"(attempt {attempt + 1}/{self.max_retries})")
+            return delay
+        
+        logger.error(f"AI API call failed: {error}")
+        return None
+    
+    def _log_stream_progress(self, parts: List[str]):
+        """Debug-log streaming progress every 50 chunks"""
+        if len(parts) % 50 == 0 and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"AI response streaming: {sum(map(len, parts))} characters received")
+    
+    def _check_stop_reason(self, message: Any):
+        """Warn when the response was cut off by max_tokens (the JSON will be incomplete)"""
+        if getattr(message, 'stop_reason', None) == 'max_tokens':
+            logger.warning(f"AI response truncated at max_tokens={self.config['max_tokens']}; "
+                          f"consider lowering endpoints_per_prompt or raising max_tokens")
+    
+    def _is_retryable(self, error: Exception) -> bool:
+        """Rate limits, connection problems and 5xx/overloaded responses are transient"""
+        import anthropic
+        
+        return isinstance(error, (
+            anthropic.RateLimitError,
+            anthropic.APIConnectionError,
+            anthropic.InternalServerError
+        ))
+    
+    def _retry_delay(self, attempt: int, error: Exception) -> float:
+        """Exponential backoff with jitter, honouring the server's retry-after header"""
+        response = getattr(error, 'response', None)
+        retry_after = response.headers.get('retry-after') if response is not None else None
+        
+        try:
+            if retry_after is not None:
+                return min(float(retry_after), 60.0)
+        except ValueError:
+            pass  # HTTP-date form, fall back to backoff
+        
+        return min(2.0 ** attempt, 60.0) + random.uniform(0, 1)
     
     def _parse_analysis_response(self, response: str, spec_data: Dict) -> Dict:
         """Parse AI response into structured format"""
@@ -200,7 +535,7 @@ Rules:
             # Try to fix common JSON issues
             json_str = self._fix_json_format(json_str)
             
-            analysis = json.loads(json_str)
+            analysis = json_loads(json_str)
             
             # Validate structure
             if 'test_scenarios' not in analysis:
@@ -212,13 +547,8 @@ Rules:
             analysis['total_scenarios'] = len(analysis['test_scenarios'])
             
             # Calculate coverage
-            covered_endpoints = set()
-            for scenario in analysis['test_scenarios']:
-                covered_endpoints.add(scenario['endpoint'])
-            
-            analysis['coverage_percentage'] = (
-                len(covered_endpoints) / len(spec_data['endpoints']) * 100
-                if spec_data['endpoints'] else 0
+            analysis['coverage_percentage'] = self._coverage_percentage(
+                analysis['test_scenarios'], spec_data
             )
             
             return analysis
@@ -238,15 +568,8 @@ Rules:
     
     def _fix_json_format(self, json_str: str) -> str:
         """Attempt to fix common JSON formatting issues"""
-        import re
-        
-        # Fix missing commas between array elements
-        json_str = re.sub(r'"\s*\n\s*([}\]])', r'"\n\1', json_str)
-        
-        # Fix missing commas between object properties
-        json_str = re.sub(r'"\s*\n\s*"', r'",\n"', json_str)
-        
-        return json_str
+        # Fix missing commas between object properties / array strings
+        return _MISSING_COMMA.sub('",\n"', json_str)
 
     def _create_fallback_analysis(self, spec_data: Dict) -> Dict:
         """Create basic analysis when AI response fails"""
@@ -306,16 +629,17 @@ Rules:
             'api_info': spec_data['info'],
             'total_endpoints': len(spec_data['endpoints']),
             'total_scenarios': len(test_scenarios),
-            'coverage_percentage': 100.0
+            'coverage_percentage': 100.0,
+            'fallback': True
         }
 
     def generate_test_name(self, scenario: Dict) -> str:
         """Generate a pytest-friendly test name"""
-        endpoint = scenario['endpoint'].replace('/', '_').replace('{', '').replace('}', '')
+        endpoint = scenario['endpoint'].translate(_NAME_TABLE)
         test_type = scenario['test_type']
         
-        # Clean up scenario name
-        name_parts = scenario['scenario_name'].lower().split()
+        # Clean up scenario name (stop splitting once the first 6 words are found)
+        name_parts = scenario['scenario_name'].lower().split(None, 6)
         name = '_'.join(name_parts[:6])  # Limit length
         
         return f"test_{endpoint}_{test_type}_{name}"
@@ -323,15 +647,9 @@ Rules:
 
 def estimate_test_count(analysis: Dict) -> Dict[str, int]:
     """Estimate test counts by type"""
-    counts = {
-        'positive': 0,
-        'negative': 0,
-        'edge_case': 0,
-        'security': 0
-    }
-    
-    for scenario in analysis.get('test_scenarios', []):
-        test_type = scenario.get('test_type', 'positive')
-        counts[test_type] = counts.get(test_type, 0) + 1
-    
+    counts = dict.fromkeys(('positive', 'negative', 'edge_case', 'security'), 0)
+    counts.update(Counter(
+        scenario.get('test_type', 'positive')
+        for scenario in analysis.get('test_scenarios', ())
+    ))
     return counts
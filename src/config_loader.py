@@ -2,18 +2,23 @@
 Configuration Loader
 """
 
-import yaml
+import copy
+import functools
 import os
 import re
 from pathlib import Path
-from typing import Dict, Any
-from dotenv import load_dotenv
+from typing import Dict, Any, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
+# Matches ${ENV_VAR} placeholders in config text
+_ENV_PATTERN = re.compile(r'\$\{([^}]+)\}')
+
+# Parsed configs keyed by resolved path: (env-substituted text, parsed dict).
+# Keying on the substituted text means both file edits and changed ${VAR}
+# values are cache misses.
+_CONFIG_CACHE: Dict[str, Tuple[str, Dict[str, Any]]] = {}
 
 
 def load_config(config_path: str = 'config.yaml') -> Dict[str, Any]:
@@ -31,20 +36,34 @@ def load_config(config_path: str = 'config.yaml') -> Dict[str, Any]:
     if not path.exists():
         raise FileNotFoundError(f"Configuration file not found: {config_path}")
     
-    with open(path, 'r') as f:
-        config_text = f.read()
+    # Deferred imports keep CLI startup fast (e.g. --help)
+    from dotenv import load_dotenv
+
+    # Load environment variables
+    load_dotenv()
+
+    config_text = path.read_text(encoding='utf-8')
     
     # Substitute environment variables
     config_text = substitute_env_vars(config_text)
     
-    # Parse YAML
-    config = yaml.safe_load(config_text)
+    # Reuse the parsed config while the substituted text is unchanged
+    cache_key = str(path.resolve())
+    cached = _CONFIG_CACHE.get(cache_key)
+    if cached is not None and cached[0] == config_text:
+        logger.debug(f"Using cached configuration for {config_path}")
+        config = copy.deepcopy(cached[1])
+    else:
+        import yaml
+        
+        # Parse YAML (libyaml's C loader when PyYAML was built with it)
+        config = yaml.load(config_text, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+        _CONFIG_CACHE[cache_key] = (config_text, copy.deepcopy(config))
+        logger.debug(f"Loaded configuration from {config_path}")
     
-    # Validate required sections
+    # Validate required sections (every call: it also checks the environment)
     validate_config(config)
     
-    logger.debug(f"Loaded configuration from {config_path}")
-    
     return config
 
 
@@ -58,8 +77,6 @@ def substitute_env_vars(text: str) -> str:
     Returns:
         Text with substituted values
     """
-    pattern = re.compile(r'\$\{([^}]+)\}')
-    
     def replacer(match):
         var_name = match.group(1)
         value = os.getenv(var_name)
@@ -70,7 +87,7 @@ def substitute_env_vars(text: str) -> str:
         
         return value
     
-    return pattern.sub(replacer, text)
+    return _ENV_PATTERN.sub(replacer, text)
 
 
 def validate_config(config: Dict[str, Any]):
@@ -94,9 +111,13 @@ def validate_config(config: Dict[str, Any]):
     if 'provider' not in ai_config:
         raise ValueError("AI provider not specified in configuration")
     
+    # Offline runs only replay cached analyses, so no API key is needed
+    if ai_config.get('offline', False):
+        return
+    
     # Check API key is available (CRITICAL FIX)
     api_key_env = ai_config.get('api_key_env', 'ANTHROPIC_API_KEY')
-    if not os.getenv(api_key_env):
+    if not os.environ.get(api_key_env):
         raise ValueError(
             f"Required environment variable not set: {api_key_env}\n"
             f"Please set it in your .env file or environment.\n"
@@ -116,10 +137,9 @@ def get_config_value(config: Dict[str, Any], key_path: str, default: Any = None)
     Returns:
         Configuration value or default
     """
-    keys = key_path.split('.')
     value = config
     
-    for key in keys:
+    for key in _split_key_path(key_path):
         if isinstance(value, dict) and key in value:
             value = value[key]
         else:
@@ -128,6 +148,12 @@ def get_config_value(config: Dict[str, Any], key_path: str, default: Any = None)
     return value
 
 
+@functools.lru_cache(maxsize=128)
+def _split_key_path(key_path: str) -> Tuple[str, ...]:
+    """Split a dot-separated key path once; repeated lookups hit the cache"""
+    return tuple(key_path.split('.'))
+
+
 def merge_configs(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
     """
     Recursively merge two configuration dictionaries
@@ -226,10 +252,18 @@ def save_config(config: Dict[str, Any], output_path: str = 'config.yaml') -> Pat
     Returns:
         Path to saved config file
     """
+    import yaml
+
     output = Path(output_path)
     
     with open(output, 'w') as f:
-        yaml.dump(config, f, default_flow_style=False, sort_keys=False)
+        yaml.dump(
+            config,
+            f,
+            Dumper=getattr(yaml, 'CSafeDumper', yaml.SafeDumper),
+            default_flow_style=False,
+            sort_keys=False
+        )
     
     logger.info(f"Configuration saved to {output_path}")
     
@@ -2,36 +2,166 @@
 Reporter - Generate HTML reports and send email notifications
 """
 
+import atexit
+import gzip
+import heapq
+from bisect import bisect_right
+from itertools import accumulate
+from operator import itemgetter
+from statistics import fmean
 import json
 import logging
+import re
+import weakref
+from collections import Counter
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from datetime import datetime
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from jinja2 import (
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    TemplateNotFound,
+    select_autoescape,
+)
 import smtplib
+from email.mime.application import MIMEApplication
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
 logger = logging.getLogger(__name__)
 
+# Write buffer for report files (default 8 KiB means hundreds of write() calls per report)
+_WRITE_BUFFER_SIZE = 1024 * 1024
+
+
+def _keyword_pattern(*keywords: str) -> re.Pattern:
+    """Compile a substring alternation matching any of the keywords"""
+    return re.compile('|'.join(map(re.escape, keywords)))
+
+
+# Test-name keywords per category, checked in this order (first match wins)
+_POSITIVE_RE = _keyword_pattern(
+    'valid', 'successful', 'retrieve_existing', 'create_valid',
+    'successfully', 'positive', 'retrieve_all'
+)
+_NEGATIVE_RE = _keyword_pattern(
+    'invalid', 'missing', 'malformed', 'non_existent',
+    'negative', 'incorrect', 'wrong'
+)
+_EDGE_CASE_RE = _keyword_pattern(
+    'edge', 'boundary', 'maximum', 'minimum', 'zero',
+    'null', 'negative_id', 'special_characters', 'empty',
+    'concurrent', 'mass_', 'very_large'
+)
+_SECURITY_RE = _keyword_pattern(
+    'security', 'auth', 'injection', 'xss', 'enumeration',
+    'disclosure', 'rate_limit', 'rate_limiting', 'sql_injection'
+)
+
+# Test-name categories in priority order
+_NAME_CATEGORIES = (
+    ('positive', _POSITIVE_RE),
+    ('negative', _NEGATIVE_RE),
+    ('edge_case', _EDGE_CASE_RE),
+    ('security', _SECURITY_RE),
+)
+
+
+def _categorize_names(names: List[str]) -> List[str]:
+    """
+    Categorize lowercased test names with one regex scan per category
+    
+    Names are joined into a single newline-separated string (no keyword spans a
+    newline) and each match is mapped back to its name by bisecting line offsets.
+    Categories are applied lowest priority first so the first match in
+    _NAME_CATEGORIES wins, exactly like an if/elif cascade per name.
+    """
+    if not names:
+        return []
+    
+    blob = '\n'.join(names)
+    starts = list(accumulate((len(name) + 1 for name in names[:-1]), initial=0))
+    categories = ['other'] * len(names)
+    
+    for category, pattern in reversed(_NAME_CATEGORIES):
+        for match in pattern.finditer(blob):
+            categories[bisect_right(starts, match.start()) - 1] = category
+    
+    return categories
+
+
+# Failure-message categories, checked in this order (first match wins)
+_FAILURE_PATTERNS = [
+    (_keyword_pattern('timeout'), 'Timeout'),
+    (_keyword_pattern('auth'), 'Authentication'),
+    (_keyword_pattern('404', 'not found'), 'Not Found'),
+    (_keyword_pattern('500', 'server error'), 'Server Error'),
+    (_keyword_pattern('assertion'), 'Assertion Failed'),
+]
+
+
+# Reporters holding an open SMTP connection; one atexit hook closes any the
+# caller forgot, without keeping the reporters themselves alive
+_OPEN_REPORTERS: "weakref.WeakSet[Reporter]" = weakref.WeakSet()
+
+
+@atexit.register
+def _close_open_reporters():
+    for reporter in list(_OPEN_REPORTERS):
+        reporter.close()
+
 
 class Reporter:
-    """Generate test reports and notifications"""
+    """
+    Generate test reports and notifications
     
-    def __init__(self, config: Dict):
-        """Initialize reporter"""
+    Call close() (or use as a context manager) to release the cached SMTP connection.
+    """
+    
+    def __init__(self, config: Dict, cache_dir: Optional[str] = None):
+        """
+        Initialize reporter
+        
+        Args:
+            config: Reporting configuration section
+            cache_dir: Directory for compiled template bytecode (None disables it)
+        """
         self.config = config
         
+        # SMTP connection reused across send_email_report calls
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._smtp_key: Optional[tuple] = None
+        
         # Setup Jinja2 environment
         template_dir = Path('templates')
         if not template_dir.exists():
             template_dir.mkdir(parents=True)
             self._create_default_template()
         
+        # Templates don't change during a run, so skip per-render mtime checks;
+        # compiled bytecode is persisted so later runs skip parsing/compiling
+        bytecode_cache = None
+        if cache_dir:
+            Path(cache_dir).mkdir(parents=True, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(directory=cache_dir, pattern='__jinja2_%s.cache')
+        
         self.env = Environment(
             loader=FileSystemLoader(str(template_dir)),
-            autoescape=select_autoescape(['html', 'xml'])
+            autoescape=select_autoescape(['html', 'xml']),
+            auto_reload=False,
+            cache_size=400,
+            bytecode_cache=bytecode_cache
         )
+        # Plain callable instead of a "%.1f"|format filter chain per row
+        self.env.globals['fmt_pct'] = "{:.1f}%".format
+        
+        # Compile the report template once; repeat reports reuse it
+        try:
+            self._template = self.env.get_template('report_template.html')
+        except TemplateNotFound:
+            self._create_default_template()
+            self._template = self.env.get_template('report_template.html')
     
     def generate_report(
         self,
@@ -57,10 +187,6 @@ class Reporter:
         # Prepare report data
         report_data = self._prepare_report_data(spec_data, test_results, analysis)
         
-        # Render template
-        template = self.env.get_template('report_template.html')
-        html_content = template.render(**report_data)
-        
         # Write report
         output_path = Path(output_dir)
         output_path.mkdir(exist_ok=True, parents=True)
@@ -68,7 +194,11 @@ class Reporter:
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         report_file = output_path / f'test_report_{timestamp}.html'
         
-        report_file.write_text(html_content, encoding='utf-8')
+        # Render straight to the file instead of building the whole HTML string
+        stream = self._template.stream(**report_data)
+        stream.enable_buffering(size=64)
+        with open(report_file, 'wb', buffering=_WRITE_BUFFER_SIZE) as fh:
+            stream.dump(fh, encoding='utf-8')
         
         logger.info(f"Report generated: {report_file}")
         
@@ -81,26 +211,31 @@ class Reporter:
         analysis: Dict
     ) -> Dict[str, Any]:
         """Prepare data for report template"""
+        now = datetime.now()
+        info = spec_data['info']
+        endpoints = spec_data['endpoints']
+        failed = test_results['failed']
         
         # Executive summary
         executive_summary = {
-            'api_name': spec_data['info']['title'],
-            'api_version': spec_data['info']['version'],
-            'test_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'api_name': info['title'],
+            'api_version': info['version'],
+            'test_date': now.strftime('%Y-%m-%d %H:%M:%S'),
             'total_tests': test_results['total_tests'],
             'passed': test_results['passed'],
-            'failed': test_results['failed'],
+            'failed': failed,
             'skipped': test_results.get('skipped', 0),
             'pass_rate': test_results['pass_rate'],
             'duration': test_results['duration'],
-            'status': 'PASSED' if test_results['failed'] == 0 else 'FAILED'
+            'status': 'PASSED' if failed == 0 else 'FAILED'
         }
         
         # Coverage metrics
+        analysis_get = analysis.get
         coverage = {
-            'total_endpoints': len(spec_data['endpoints']),
-            'tested_endpoints': analysis.get('total_scenarios', 0),
-            'coverage_percentage': analysis.get('coverage_percentage', 0),
+            'total_endpoints': len(endpoints),
+            'tested_endpoints': analysis_get('total_scenarios', 0),
+            'coverage_percentage': analysis_get('coverage_percentage', 0),
             'untested_endpoints': []
         }
         
@@ -120,9 +255,10 @@ class Reporter:
             'test_results': test_results,
             'failure_analysis': failure_analysis,
             'performance': performance,
-            'spec_data': spec_data,
+            # Only the flattened parts; raw_spec can be megabytes the template never reads
+            'spec_data': {'info': info, 'endpoints': endpoints},
             'analysis': analysis,
-            'generated_at': datetime.now().isoformat()
+            'generated_at': now.isoformat()
         }
     
     def _calculate_test_breakdown(self, test_results: Dict) -> Dict[str, int]:
@@ -153,33 +289,12 @@ class Reporter:
         # Fallback: Parse test names with improved keyword matching
         logger.debug("Falling back to test name parsing for breakdown")
         
-        for test in test_results.get('tests', []):
-            name = test.get('name', '').lower()
-            
-            # Expanded keyword matching
-            if any(word in name for word in [
-                'valid', 'successful', 'retrieve_existing', 'create_valid',
-                'successfully', 'positive', 'retrieve_all'
-            ]):
-                breakdown['positive'] += 1
-            elif any(word in name for word in [
-                'invalid', 'missing', 'malformed', 'non_existent',
-                'negative', 'incorrect', 'wrong'
-            ]):
-                breakdown['negative'] += 1
-            elif any(word in name for word in [
-                'edge', 'boundary', 'maximum', 'minimum', 'zero',
-                'null', 'negative_id', 'special_characters', 'empty',
-                'concurrent', 'mass_', 'very_large'
-            ]):
-                breakdown['edge_case'] += 1
-            elif any(word in name for word in [
-                'security', 'auth', 'injection', 'xss', 'enumeration',
-                'disclosure', 'rate_limit', 'rate_limiting', 'sql_injection'
-            ]):
-                breakdown['security'] += 1
-            else:
-                breakdown['other'] += 1
+        tests = test_results.get('tests', [])
+        if hasattr(tests, 'names'):
+            names = [name.lower() for name in tests.names]
+        else:
+            names = [test.get('name', '').lower() for test in tests]
+        breakdown.update(Counter(_categorize_names(names)))
         
         logger.debug(f"Test breakdown from names: {breakdown}")
         return breakdown
@@ -196,29 +311,19 @@ class Reporter:
             }
         
         # Group by error type
-        by_category = {}
+        by_category = Counter()
         for failure in failures:
             # Simple categorization based on message
             message = failure.get('message', '').lower()
-            
-            if 'timeout' in message:
-                category = 'Timeout'
-            elif 'authentication' in message or 'auth' in message:
-                category = 'Authentication'
-            elif '404' in message or 'not found' in message:
-                category = 'Not Found'
-            elif '500' in message or 'server error' in message:
-                category = 'Server Error'
-            elif 'assertion' in message:
-                category = 'Assertion Failed'
-            else:
-                category = 'Other'
-            
-            by_category[category] = by_category.get(category, 0) + 1
+            category = next(
+                (name for pattern, name in _FAILURE_PATTERNS if pattern.search(message)),
+                'Other'
+            )
+            by_category[category] += 1
         
         return {
             'total': len(failures),
-            'by_category': by_category,
+            'by_category': dict(by_category),
             'top_failures': failures[:5]  # Top 5 failures
         }
     
@@ -234,24 +339,32 @@ class Reporter:
                 'slow_tests': []
             }
         
-        durations = [t.get('duration', 0) for t in tests]
-        
-        avg_duration = sum(durations) / len(durations) if durations else 0
-        min_duration = min(durations) if durations else 0
-        max_duration = max(durations) if durations else 0
-        
-        # Find slow tests (>2 seconds)
-        slow_tests = [
-            t for t in tests
-            if t.get('duration', 0) > 2.0
-        ]
-        slow_tests.sort(key=lambda x: x.get('duration', 0), reverse=True)
+        # Executor results keep durations as a column; hand-built lists of dicts
+        # usually carry a duration but may not
+        if hasattr(tests, 'durations'):
+            durations = tests.durations.tolist()
+        else:
+            try:
+                durations = list(map(itemgetter('duration'), tests))
+            except KeyError:
+                durations = [t.get('duration', 0) for t in tests]
+        
+        avg_duration = fmean(durations)
+        min_duration = min(durations)
+        max_duration = max(durations)
+        
+        # Top 5 slow tests (>2 seconds), ranked by index into the extracted durations
+        slow_indices = heapq.nlargest(
+            5,
+            (i for i, d in enumerate(durations) if d > 2.0),
+            key=durations.__getitem__
+        )
         
         return {
             'avg_duration': avg_duration,
             'min_duration': min_duration,
             'max_duration': max_duration,
-            'slow_tests': slow_tests[:5]  # Top 5 slowest
+            'slow_tests': [tests[i] for i in slow_indices]
         }
     
     def send_email_report(self, report_path: Path, test_results: Dict):
@@ -270,7 +383,7 @@ class Reporter:
         
         try:
             # Create message
-            msg = MIMEMultipart('alternative')
+            msg = MIMEMultipart('mixed')
             
             subject_prefix = email_config.get('subject_prefix', '[API Tests]')
             status = 'PASSED' if test_results['failed'] == 0 else 'FAILED'
@@ -282,31 +395,77 @@ class Reporter:
             text_body = self._create_email_text(test_results)
             msg.attach(MIMEText(text_body, 'plain'))
             
-            # Read and attach HTML report
-            html_body = report_path.read_text(encoding='utf-8')
-            msg.attach(MIMEText(html_body, 'html'))
+            # Attach the HTML report gzipped (the raw bytes are never decoded)
+            attachment = MIMEApplication(gzip.compress(report_path.read_bytes()), 'gzip')
+            attachment.add_header('Content-Disposition', 'attachment', filename=f"{report_path.name}.gz")
+            msg.attach(attachment)
             
             # Send email
-            smtp_host = email_config['smtp_host']
-            smtp_port = email_config['smtp_port']
-            
-            with smtplib.SMTP(smtp_host, smtp_port) as server:
-                if email_config.get('use_tls', True):
-                    server.starttls()
-                
-                username = email_config.get('username')
-                password = email_config.get('password')
-                
-                if username and password:
-                    server.login(username, password)
-                
-                server.send_message(msg)
+            server = self._get_smtp(email_config)
+            server.send_message(msg)
             
             logger.info("Email report sent successfully")
             
         except Exception as e:
             logger.error(f"Failed to send email: {e}")
     
+    def _get_smtp(self, email_config: Dict) -> smtplib.SMTP:
+        """Return a logged-in SMTP connection, reusing the previous one while it's alive"""
+        # A connection is only reused for the same server and login
+        key = (
+            email_config['smtp_host'],
+            email_config['smtp_port'],
+            email_config.get('username'),
+            email_config.get('use_tls', True)
+        )
+        if self._smtp is not None and self._smtp_key != key:
+            self.close()
+        
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.close()
+        
+        server = smtplib.SMTP(email_config['smtp_host'], email_config['smtp_port'])
+        try:
+            if email_config.get('use_tls', True):
+                server.starttls()
+            
+            username = email_config.get('username')
+            password = email_config.get('password')
+            
+            if username and password:
+                server.login(username, password)
+        except Exception:
+            server.close()
+            raise
+        
+        self._smtp = server
+        self._smtp_key = key
+        _OPEN_REPORTERS.add(self)
+        return server
+    
+    def close(self):
+        """Close the cached SMTP connection, if any"""
+        _OPEN_REPORTERS.discard(self)
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self._smtp.close()
+        self._smtp = None
+        self._smtp_key = None
+    
+    def __enter__(self) -> 'Reporter':
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
     def _create_email_text(self, test_results: Dict) -> str:
         """Create plain text email body"""
         status = 'PASSED' if test_results['failed'] == 0 else 'FAILED'
@@ -391,6 +550,7 @@ See attached HTML report for full details.
 </body>
 </html>"""
         
-        template_path.write_text(minimal_template)
+        with open(template_path, 'w', buffering=_WRITE_BUFFER_SIZE) as fh:
+            fh.write(minimal_template)
         logger.info(f"Created minimal template at {template_path}")
         logger.info("For professional reports, replace with the full template from templates/report_template.html")
\ No newline at end of file
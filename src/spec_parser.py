@@ -5,14 +5,36 @@ Handles parsing and validation of OpenAPI 3.0+ specifications
 
 import yaml
 import json
+import hashlib
+import pickle
 import requests
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple, Union
 from urllib.parse import urlparse
 import logging
 
+from .utils import CACHE_SUFFIX, atomic_write_bytes, compress_bytes, decompress_bytes, json_loads
+
 logger = logging.getLogger(__name__)
 
+# Shared session so repeated spec fetches reuse pooled keep-alive connections
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    'Accept-Encoding': 'gzip, deflate',
+    'Accept': 'application/json, application/yaml;q=0.9, */*;q=0.8'
+})
+
+# Path item keys that are operations (others are e.g. parameters, summary, servers)
+_HTTP_METHODS = frozenset({'get', 'post', 'put', 'patch', 'delete', 'options', 'head'})
+
+# libyaml's C loader is much faster on large specs; PyYAML may be built without it
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+    logger.debug("libyaml not available, using pure-Python YAML loader "
+                 "(reinstall PyYAML with libyaml for faster spec parsing)")
+
 
 class SpecParser:
     """Parse and extract information from OpenAPI specifications"""
@@ -27,6 +49,9 @@ class SpecParser:
         self.spec_source = spec_source
         self.spec_data: Optional[Dict] = None
         
+        # Resolved local $refs, so endpoints reusing a component share one object
+        self._ref_cache: Dict[str, Optional[Dict]] = {}
+        
     def parse(self) -> Dict[str, Any]:
         """
         Parse the OpenAPI specification
@@ -37,6 +62,7 @@ class SpecParser:
         # Load the spec
         raw_spec = self._load_spec()
         self.spec_data = raw_spec
+        self._ref_cache = {}
         
         # Extract structured information
         parsed_data = {
@@ -69,14 +95,14 @@ class SpecParser:
         """Load spec from URL"""
         logger.debug(f"Fetching spec from URL: {url}")
         try:
-            response = requests.get(url, timeout=30)
+            response = _SESSION.get(url, timeout=30)
             response.raise_for_status()
             
-            # Try JSON first, then YAML
+            # Try JSON first (parsed from the raw bytes), then YAML
             try:
-                return response.json()
+                return json_loads(response.content)
             except json.JSONDecodeError:
-                return yaml.safe_load(response.text)
+                return yaml.load(response.content, Loader=_YamlLoader)
                 
         except requests.RequestException as e:
             raise ValueError(f"Failed to fetch spec from URL: {e}")
@@ -90,18 +116,19 @@ class SpecParser:
         
         logger.debug(f"Loading spec from file: {filepath}")
         
-        with open(path, 'r') as f:
+        # Read as bytes: both parsers detect the encoding themselves
+        with open(path, 'rb') as f:
             if path.suffix in ('.yaml', '.yml'):
-                return yaml.safe_load(f)
+                return yaml.load(f, Loader=_YamlLoader)
             elif path.suffix == '.json':
-                return json.load(f)
+                return json_loads(f.read())
             else:
                 # Try to detect format
                 content = f.read()
                 try:
-                    return json.loads(content)
+                    return json_loads(content)
                 except json.JSONDecodeError:
-                    return yaml.safe_load(content)
+                    return yaml.load(content, Loader=_YamlLoader)
     
     def _extract_info(self, spec: Dict) -> Dict:
         """Extract API info"""
@@ -133,33 +160,35 @@ class SpecParser:
     def _extract_endpoints(self, spec: Dict) -> List[Dict]:
         """Extract all API endpoints"""
         paths = spec.get('paths', {})
+        spec_security = spec.get('security', [])
         endpoints = []
         
         for path, path_item in paths.items():
             # Handle path-level parameters
             path_params = path_item.get('parameters', [])
             
-            for method in ['get', 'post', 'put', 'patch', 'delete', 'options', 'head']:
-                if method not in path_item:
+            # Operations are taken in the order the spec declares them
+            for method, operation in path_item.items():
+                if method not in _HTTP_METHODS:
                     continue
                 
-                operation = path_item[method]
+                op_get = operation.get
                 
                 endpoint = {
                     'path': path,
                     'method': method.upper(),
-                    'operation_id': operation.get('operationId', f"{method}_{path.replace('/', '_')}"),
-                    'summary': operation.get('summary', ''),
-                    'description': operation.get('description', ''),
-                    'tags': operation.get('tags', []),
+                    'operation_id': op_get('operationId', f"{method}_{path.replace('/', '_')}"),
+                    'summary': op_get('summary', ''),
+                    'description': op_get('description', ''),
+                    'tags': op_get('tags', []),
                     'parameters': self._merge_parameters(
                         path_params,
-                        operation.get('parameters', [])
+                        op_get('parameters', [])
                     ),
-                    'request_body': self._extract_request_body(operation.get('requestBody')),
-                    'responses': self._extract_responses(operation.get('responses', {})),
-                    'security': operation.get('security', spec.get('security', [])),
-                    'deprecated': operation.get('deprecated', False)
+                    'request_body': self._extract_request_body(op_get('requestBody')),
+                    'responses': self._extract_responses(op_get('responses', {})),
+                    'security': op_get('security', spec_security),
+                    'deprecated': op_get('deprecated', False)
                 }
                 
                 endpoints.append(endpoint)
@@ -172,8 +201,9 @@ class SpecParser:
         
         for param in path_params + op_params:
             if '$ref' in param:
-                # TODO: Resolve $ref
-                continue
+                param = self._resolve_ref(param['$ref'])
+                if param is None:
+                    continue
             
             all_params.append({
                 'name': param.get('name'),
@@ -191,20 +221,62 @@ class SpecParser:
         if not request_body:
             return None
         
+        if '$ref' in request_body:
+            request_body = self._resolve_ref(request_body['$ref'])
+            if request_body is None:
+                return None
+        
         content = request_body.get('content', {})
         
         # Support common content types
         for content_type in ['application/json', 'application/xml', 'multipart/form-data']:
             if content_type in content:
+                schema = content[content_type].get('schema', {})
+                if '$ref' in schema:
+                    schema = self._resolve_ref(schema['$ref']) or schema
+                
                 return {
                     'content_type': content_type,
-                    'schema': content[content_type].get('schema', {}),
+                    'schema': schema,
                     'required': request_body.get('required', False),
                     'description': request_body.get('description', '')
                 }
         
         return None
     
+    def _resolve_ref(self, ref: str) -> Optional[Dict]:
+        """
+        Resolve a local JSON reference (e.g. '#/components/parameters/limit')
+        
+        Results are memoized per ref string and chained refs are followed.
+        External refs and broken pointers resolve to None with a warning.
+        """
+        if ref in self._ref_cache:
+            return self._ref_cache[ref]
+        
+        # Placeholder guards against reference cycles
+        self._ref_cache[ref] = None
+        
+        node = None
+        if ref.startswith('#/'):
+            node = self.spec_data
+            for token in ref[2:].split('/'):
+                token = token.replace('~1', '/').replace('~0', '~')
+                if not isinstance(node, dict) or token not in node:
+                    node = None
+                    break
+                node = node[token]
+        
+        if isinstance(node, dict) and '$ref' in node:
+            node = self._resolve_ref(node['$ref'])
+        
+        if not isinstance(node, dict):
+            logger.warning(f"Could not resolve $ref: {ref}")
+            node = None
+        
+        self._ref_cache[ref] = node
+        return node
+    
     def _extract_responses(self, responses: Dict) -> Dict[str, Dict]:
         """Extract response definitions"""
         extracted = {}
@@ -253,9 +325,109 @@ def get_endpoint_signature(endpoint: Dict) -> str:
     return f"{endpoint['method']} {endpoint['path']}"
 
 
-def find_endpoint_by_path(endpoints: List[Dict], method: str, path: str) -> Optional[Dict]:
-    """Find an endpoint by method and path"""
+def build_endpoint_index(endpoints: List[Dict]) -> Dict[Tuple[str, str], Dict]:
+    """Index endpoints by (METHOD, path) for constant-time lookups"""
+    return {(endpoint['method'], endpoint['path']): endpoint for endpoint in endpoints}
+
+
+def find_endpoint_by_path(
+    endpoints: Union[List[Dict], Dict[Tuple[str, str], Dict]],
+    method: str,
+    path: str
+) -> Optional[Dict]:
+    """
+    Find an endpoint by method and path
+    
+    Args:
+        endpoints: Endpoint list (scanned), or an index from build_endpoint_index
+        method: HTTP method (any case)
+        path: Path template as written in the spec
+        
+    Returns:
+        Matching endpoint or None
+    
+    For repeated lookups, build the index once with build_endpoint_index()
+    and pass that instead of the list.
+    """
+    method = method.upper()
+    
+    if isinstance(endpoints, dict):
+        return endpoints.get((method, path))
+    
     for endpoint in endpoints:
-        if endpoint['method'] == method.upper() and endpoint['path'] == path:
+        if endpoint['method'] == method and endpoint['path'] == path:
             return endpoint
-    return None
\ No newline at end of file
+    return None
+
+
+# Part of every spec cache key; bump whenever SpecParser.parse() output changes
+# shape or content (e.g. new fields, $ref resolution, ordering) so stale
+# pickles from older parsers are not reused
+_SPEC_CACHE_VERSION = 3
+
+
+def load_spec_cached(spec_source: str, cache_dir: str = '.cache/spec') -> Dict[str, Any]:
+    """
+    Parse an OpenAPI spec, reusing the parsed result from a previous run if the source is unchanged
+
+    Local files are keyed by path, mtime and size; URLs by the ETag/Last-Modified
+    returned from a HEAD request. URLs without either header are always re-parsed.
+    Keys also include _SPEC_CACHE_VERSION, so parser changes invalidate old entries.
+
+    Args:
+        spec_source: URL or file path to OpenAPI spec
+        cache_dir: Directory holding compressed, pickled parse results
+
+    Returns:
+        Dictionary containing structured spec data (same as SpecParser.parse)
+    """
+    parser = SpecParser(spec_source)
+    fingerprint = _spec_fingerprint(parser, spec_source)
+
+    if fingerprint is None:
+        return parser.parse()
+
+    key = hashlib.blake2b(fingerprint.encode('utf-8')).hexdigest()
+    cache_file = Path(cache_dir) / f"{key}.pkl{CACHE_SUFFIX}"
+
+    if cache_file.exists():
+        try:
+            spec_data = pickle.loads(decompress_bytes(cache_file.read_bytes()))
+            logger.debug(f"Loaded parsed spec from cache: {cache_file}")
+            return spec_data
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable spec cache {cache_file}: {e}")
+
+    spec_data = parser.parse()
+
+    try:
+        atomic_write_bytes(cache_file, compress_bytes(pickle.dumps(spec_data, protocol=5)))
+        logger.debug(f"Cached parsed spec: {cache_file}")
+    except OSError as e:
+        logger.warning(f"Failed to write spec cache: {e}")
+
+    return spec_data
+
+
+def _spec_fingerprint(parser: SpecParser, spec_source: str) -> Optional[str]:
+    """Build a cache fingerprint for a spec source, or None if it can't be validated"""
+    if parser._is_url(spec_source):
+        try:
+            response = _SESSION.head(spec_source, timeout=10, allow_redirects=True)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            logger.debug(f"Spec cache disabled, HEAD request failed: {e}")
+            return None
+
+        validator = response.headers.get('ETag') or response.headers.get('Last-Modified')
+        if not validator:
+            return None
+        return f"v{_SPEC_CACHE_VERSION}\nurl\n{spec_source}\n{validator}"
+
+    path = Path(spec_source)
+    if not path.exists():
+        # Let the parser raise its usual FileNotFoundError
+        return None
+
+    stat = path.stat()
+    return f"v{_SPEC_CACHE_VERSION}\nfile\n{path.resolve()}\n{stat.st_mtime_ns}\n{stat.st_size}"
@@ -2,16 +2,153 @@
 Test Executor - Runs pytest tests and collects results
 """
 
+import contextlib
+import io
 import subprocess
-import json
 import logging
+import os
+import re
+import selectors
+from array import array
+from collections import Counter
+from collections.abc import Sequence
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Callable, Dict, Iterator, List, Any, Optional, Union
 from datetime import datetime
 import time
 
+from .utils import RESULTS_STREAM_ENV, json_loads
+
 logger = logging.getLogger(__name__)
 
+# Counts in pytest's summary line, e.g. "5 passed, 2 failed, 1 skipped in 10.23s"
+_SUMMARY_RE = re.compile(r'(\d+) (passed|failed|skipped|errors?)\b')
+
+# Summary words mapped to result keys
+_SUMMARY_KEYS = {'passed': 'passed', 'failed': 'failed', 'skipped': 'skipped',
+                 'error': 'errors', 'errors': 'errors'}
+
+
+class TestRecords(Sequence):
+    """
+    Per-test results stored column-wise (one list/array per field)
+    
+    Behaves like the list of dicts it replaces: indexing, slicing and iteration
+    yield {'name', 'outcome', 'duration', 'file', 'line'} rows built on demand,
+    while the columns themselves stay compact for large suites.
+    """
+    
+    __test__ = False  # not a pytest test class despite the name
+    
+    def __init__(self):
+        self.names: List[str] = []
+        self.outcomes: List[str] = []
+        self.durations = array('d')
+        self.files: List[str] = []
+        self.lines = array('q')
+    
+    def append(self, name: str, outcome: str, duration: float, file: str, line: int):
+        """Add one test result"""
+        self.names.append(name)
+        self.outcomes.append(outcome)
+        self.durations.append(duration)
+        self.files.append(file)
+        self.lines.append(line)
+    
+    def row(self, index: int) -> Dict[str, Any]:
+        """Materialize one test result as a dict"""
+        return {
+            'name': self.names[index],
+            'outcome': self.outcomes[index],
+            'duration': self.durations[index],
+            'file': self.files[index],
+            'line': self.lines[index]
+        }
+    
+    def __len__(self) -> int:
+        return len(self.names)
+    
+    def __getitem__(self, index: Union[int, slice]) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        if isinstance(index, slice):
+            return [self.row(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('test record index out of range')
+        return self.row(index)
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return map(self.row, range(len(self)))
+
+
+class ResultStream:
+    """Incrementally reads the per-test JSON lines written by the generated conftest"""
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self.records: List[Dict[str, Any]] = []
+        self._offset = 0
+        self._partial = b''
+    
+    def reset(self):
+        """Remove the previous run's stream and forget its records"""
+        self.path.unlink(missing_ok=True)
+        self.records = []
+        self._offset = 0
+        self._partial = b''
+    
+    def poll(self) -> int:
+        """Read records appended since the last poll; returns how many were added"""
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(self._offset)
+                data = f.read()
+        except FileNotFoundError:
+            return 0
+        
+        if not data:
+            return 0
+        self._offset += len(data)
+        
+        # Keep a trailing partial line for the next poll
+        lines = (self._partial + data).split(b'\n')
+        self._partial = lines.pop()
+        
+        added = 0
+        for line in lines:
+            if not line:
+                continue
+            try:
+                self.records.append(json_loads(line))
+                added += 1
+            except ValueError as e:
+                logger.warning(f"Skipping malformed result record: {e}")
+        return added
+
+
+class RecordCollector:
+    """
+    pytest plugin that keeps per-test records in memory (in-process runs)
+    
+    Produces the same records as the generated conftest's results stream.
+    """
+    
+    def __init__(self, records: List[Dict[str, Any]]):
+        self.records = records
+    
+    def pytest_runtest_logreport(self, report):
+        # One record per test: the call phase, or setup when it failed/skipped
+        if report.when != 'call' and not (report.when == 'setup' and not report.passed):
+            return
+        
+        self.records.append({
+            'nodeid': report.nodeid,
+            'outcome': 'error' if report.when == 'setup' and report.failed else report.outcome,
+            'duration': report.duration,
+            'location': [report.location[0], report.location[1] or 0],
+            'longrepr': str(report.longrepr) if report.failed else None
+        })
+
 
 class TestExecutor:
     """Execute pytest tests and collect results"""
@@ -22,6 +159,14 @@ class TestExecutor:
         self.results_dir = Path("test_results")
         self.results_dir.mkdir(exist_ok=True, parents=True)
         
+        # Per-test records appended by the generated conftest as tests finish
+        self._stream = ResultStream(self.results_dir / 'results.jsonl')
+        self._failed_so_far = 0
+        self._next_poll = 0.0
+        
+        # Run pytest in a child process (crash isolation + timeout) unless disabled
+        self.isolate = config.get('isolate', True)
+        
         # Get timeout from config
         self.test_timeout = config.get('test_timeout', 300)
         logger.debug(f"Test execution timeout set to {self.test_timeout}s")
@@ -44,13 +189,25 @@ class TestExecutor:
         # Prepare pytest arguments
         pytest_args = self._build_pytest_args(test_files)
         
+        # Drop the previous run's outputs so they can't be mistaken for this run's
+        self._stream.reset()
+        self._failed_so_far = 0
+        self._next_poll = 0.0
+        (self.results_dir / 'report.json').unlink(missing_ok=True)
+        
         # Run pytest
-        result = self._run_pytest(pytest_args)
+        if self.isolate:
+            result = self._run_pytest(pytest_args)
+        else:
+            result = self._run_pytest_in_process(pytest_args)
         
-        duration = time.time() - start_time
+        # One clock read for both the duration and the results timestamp
+        finished = time.time()
+        duration = finished - start_time
+        timestamp = datetime.fromtimestamp(finished).isoformat()
         
         # Parse results
-        test_results = self._parse_results(result, duration)
+        test_results = self._parse_results(result, duration, timestamp)
         
         logger.info(f"Test execution complete: {test_results['passed']}/{test_results['total_tests']} passed")
         
@@ -67,13 +224,26 @@ class TestExecutor:
             '--color=yes',
         ]
         
-        # JSON report for parsing
-        json_report = self.results_dir / 'report.json'
-        args.extend([
-            '--json-report',
-            f'--json-report-file={json_report}',
-            '--json-report-indent=2'
-        ])
+        # Distribute tests across worker processes (pytest-xdist)
+        if self.config.get('parallel', False):
+            args.extend([
+                '-n', str(self._resolve_workers()),
+                # Generated tests are one file per endpoint; keep each file on one worker
+                f"--dist={self.config.get('dist', 'loadfile')}"
+            ])
+        
+        # JSON report for parsing (fallback when the per-test stream is empty);
+        # compact and without the sections _parse_results never reads.
+        # --json-report-omit takes several values, so it must be followed by
+        # another option rather than the test paths.
+        # In-process runs collect records directly and don't need it.
+        if self.isolate:
+            json_report = self.results_dir / 'report.json'
+            args.extend([
+                '--json-report',
+                f'--json-report-file={json_report}',
+                '--json-report-omit', 'collectors', 'keywords', 'streams', 'log'
+            ])
         
         # HTML report
         html_report = self.results_dir / 'pytest_report.html'
@@ -104,24 +274,29 @@ class TestExecutor:
         
         return args
     
+    def _resolve_workers(self) -> int:
+        """Number of xdist workers; "auto" leaves two cores for this process and the OS"""
+        workers = self.config.get('workers', 'auto')
+        if workers == 'auto':
+            return max(1, (os.cpu_count() or 1) - 2)
+        return max(1, int(workers))
+    
     def _run_pytest(self, args: List[str]) -> subprocess.CompletedProcess:
         """Run pytest command"""
         
         logger.debug(f"Running: {' '.join(args)}")
         
+        env = dict(os.environ, **{RESULTS_STREAM_ENV: str(self._stream.path.resolve())})
+        
         try:
-            result = subprocess.run(
-                args,
-                capture_output=True,
-                text=True,
-                timeout=self.test_timeout  # Use timeout from config
-            )
+            result = self._run_streaming(args, env=env, on_poll=self._poll_progress)
             
-            # Log output
-            if result.stdout:
-                logger.debug(f"Pytest stdout:\n{result.stdout}")
-            if result.stderr:
-                logger.debug(f"Pytest stderr:\n{result.stderr}")
+            # Log output (can be megabytes; only build the message when DEBUG is on)
+            if logger.isEnabledFor(logging.DEBUG):
+                if result.stdout:
+                    logger.debug("Pytest stdout:\n%s", result.stdout)
+                if result.stderr:
+                    logger.debug("Pytest stderr:\n%s", result.stderr)
             
             return result
             
@@ -132,14 +307,109 @@ class TestExecutor:
             logger.error(f"Failed to run pytest: {e}")
             raise
     
-    def _parse_results(self, result: subprocess.CompletedProcess, duration: float) -> Dict[str, Any]:
+    def _run_pytest_in_process(self, args: List[str]) -> subprocess.CompletedProcess:
+        """
+        Run pytest inside this interpreter, collecting records with a plugin
+        
+        Skips interpreter startup and the JSON round trip, but a crashing test
+        takes this process down with it and test_timeout is not enforced.
+        """
+        import pytest
+        
+        logger.debug(f"Running in-process: {' '.join(args)}")
+        
+        output = io.StringIO()
+        collector = RecordCollector(self._stream.records)
+        with contextlib.redirect_stdout(output):
+            exit_code = pytest.main(args[1:], plugins=[collector])
+        
+        stdout = output.getvalue()
+        if stdout and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Pytest stdout:\n%s", stdout)
+        
+        return subprocess.CompletedProcess(args, int(exit_code), stdout, '')
+    
+    def _poll_progress(self):
+        """Consume newly finished test records while pytest runs (at most every 0.5s)"""
+        now = time.monotonic()
+        if now < self._next_poll:
+            return
+        self._next_poll = now + 0.5
+        
+        added = self._stream.poll()
+        if added:
+            records = self._stream.records
+            # Only the records just read; earlier ones are already counted
+            self._failed_so_far += sum(
+                1 for r in records[-added:] if r.get('outcome') in ('failed', 'error')
+            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"{len(records)} tests finished so far ({self._failed_so_far} failed)")
+    
+    def _run_streaming(
+        self,
+        args: List[str],
+        env: Optional[Dict[str, str]] = None,
+        on_poll: Optional[Callable[[], None]] = None
+    ) -> subprocess.CompletedProcess:
+        """
+        Run a command, draining stdout/stderr as they are written so pytest never
+        blocks on a full pipe; enforces test_timeout as a wall-clock deadline
+        
+        Args:
+            args: Command line
+            env: Environment for the child process
+            on_poll: Called at least every 0.5s while the command runs
+        """
+        if os.name == 'nt':
+            # selectors can't wait on pipes on Windows
+            return subprocess.run(args, capture_output=True, text=True, env=env, timeout=self.test_timeout)
+        
+        deadline = time.monotonic() + self.test_timeout
+        stdout, stderr = bytearray(), bytearray()
+        
+        with subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env) as proc:
+            try:
+                with selectors.DefaultSelector() as selector:
+                    selector.register(proc.stdout, selectors.EVENT_READ, stdout)
+                    selector.register(proc.stderr, selectors.EVENT_READ, stderr)
+                    
+                    while selector.get_map():
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise subprocess.TimeoutExpired(args, self.test_timeout)
+                        
+                        for key, _ in selector.select(min(remaining, 0.5)):
+                            chunk = os.read(key.fd, 65536)
+                            if chunk:
+                                key.data.extend(chunk)
+                            else:
+                                selector.unregister(key.fileobj)
+                        
+                        if on_poll is not None:
+                            on_poll()
+                
+                returncode = proc.wait(timeout=max(deadline - time.monotonic(), 0))
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                raise
+        
+        return subprocess.CompletedProcess(
+            args,
+            returncode,
+            stdout.decode('utf-8', errors='replace'),
+            stderr.decode('utf-8', errors='replace')
+        )
+    
+    def _parse_results(self, result: subprocess.CompletedProcess, duration: float,
+                       timestamp: str) -> Dict[str, Any]:
         """Parse pytest results from JSON report"""
         
         json_report = self.results_dir / 'report.json'
         
         # Default results structure
         results = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': timestamp,
             'duration': duration,
             'total_tests': 0,
             'passed': 0,
@@ -147,17 +417,21 @@ class TestExecutor:
             'skipped': 0,
             'errors': 0,
             'pass_rate': 0.0,
-            'tests': [],
+            'tests': TestRecords(),
             'failures': [],
             'summary': {},
             'raw_output': result.stdout
         }
         
-        # Parse JSON report if available
-        if json_report.exists():
+        # Prefer the per-test stream (most of it was already read during the run)
+        self._stream.poll()
+        if self._stream.records:
+            self._fill_from_records(results, self._stream.records)
+        
+        # Otherwise parse JSON report if available
+        elif json_report.exists():
             try:
-                with open(json_report, 'r') as f:
-                    json_data = json.load(f)
+                json_data = json_loads(json_report.read_bytes())
                 
                 summary = json_data.get('summary', {})
                 results['total_tests'] = summary.get('total', 0)
@@ -174,6 +448,7 @@ class TestExecutor:
                     results['pass_rate'] = (results['passed'] / results['total_tests']) * 100
                 
                 # Extract test details
+                tests = results['tests']
                 for test in json_data.get('tests', []):
                     # Get duration from call phase (most accurate)
                     duration = 0
@@ -182,19 +457,18 @@ class TestExecutor:
                     elif 'duration' in test:
                         duration = test['duration']
                     
-                    test_info = {
-                        'name': test.get('nodeid', ''),
-                        'outcome': test.get('outcome', 'unknown'),
-                        'duration': float(duration),
-                        'file': test.get('location', [''])[0],
-                        'line': test.get('location', [0, 0])[1] if len(test.get('location', [])) > 1 else 0
-                    }
-                    
-                    results['tests'].append(test_info)
+                    location = test.get('location', [''])
+                    tests.append(
+                        test.get('nodeid', ''),
+                        test.get('outcome', 'unknown'),
+                        float(duration),
+                        location[0],
+                        location[1] if len(location) > 1 else 0
+                    )
                     
                     # Collect failures
                     if test.get('outcome') == 'failed':
-                        failure_info = test_info.copy()
+                        failure_info = tests.row(len(tests) - 1)
                         failure_info['message'] = test.get('call', {}).get('longrepr', 'No error message')
                         results['failures'].append(failure_info)
                 
@@ -206,15 +480,50 @@ class TestExecutor:
         else:
             # Fallback: parse from stdout
             logger.warning("JSON report not found, parsing stdout")
-            results = self._parse_stdout(result.stdout, duration)
+            results = self._parse_stdout(result.stdout, duration, timestamp)
         
         return results
     
-    def _parse_stdout(self, stdout: str, duration: float) -> Dict[str, Any]:
+    def _fill_from_records(self, results: Dict[str, Any], records: List[Dict[str, Any]]):
+        """Populate results from per-test stream records"""
+        counts = Counter(record.get('outcome', 'unknown') for record in records)
+        
+        results['total_tests'] = len(records)
+        results['passed'] = counts['passed']
+        results['failed'] = counts['failed']
+        results['skipped'] = counts['skipped']
+        results['errors'] = counts['error']
+        results['summary'] = {'total': len(records), **counts}
+        
+        logger.debug(f"Parsed from result stream: {results['total_tests']} total, "
+                    f"{results['passed']} passed, {results['failed']} failed")
+        
+        if results['total_tests'] > 0:
+            results['pass_rate'] = (results['passed'] / results['total_tests']) * 100
+        
+        tests = results['tests']
+        for record in records:
+            location = record.get('location') or ['', 0]
+            outcome = record.get('outcome', 'unknown')
+            tests.append(
+                record.get('nodeid', ''),
+                outcome,
+                float(record.get('duration') or 0),
+                location[0],
+                location[1] if len(location) > 1 else 0
+            )
+            
+            # Collect failures
+            if outcome == 'failed':
+                failure_info = tests.row(len(tests) - 1)
+                failure_info['message'] = record.get('longrepr') or 'No error message'
+                results['failures'].append(failure_info)
+    
+    def _parse_stdout(self, stdout: str, duration: float, timestamp: str) -> Dict[str, Any]:
         """Fallback: parse results from pytest stdout"""
         
         results = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': timestamp,
             'duration': duration,
             'total_tests': 0,
             'passed': 0,
@@ -222,25 +531,15 @@ class TestExecutor:
             'skipped': 0,
             'errors': 0,
             'pass_rate': 0.0,
-            'tests': [],
+            'tests': TestRecords(),
             'failures': [],
             'summary': {},
             'raw_output': stdout
         }
         
-        # Look for summary line like "5 passed, 2 failed in 10.23s"
-        for line in stdout.split('\n'):
-            if 'passed' in line or 'failed' in line:
-                if 'passed' in line:
-                    try:
-                        results['passed'] = int(line.split('passed')[0].strip().split()[-1])
-                    except:
-                        pass
-                if 'failed' in line:
-                    try:
-                        results['failed'] = int(line.split('failed')[0].strip().split()[-1])
-                    except:
-                        pass
+        # Look for summary line like "5 passed, 2 failed in 10.23s" (last one wins)
+        for match in _SUMMARY_RE.finditer(stdout):
+            results[_SUMMARY_KEYS[match.group(2)]] = int(match.group(1))
         
         results['total_tests'] = results['passed'] + results['failed']
         
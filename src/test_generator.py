@@ -2,99 +2,61 @@
 Test Generator - Creates pytest test files from AI analysis
 """
 
-import json
 import logging
+import os
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
 from datetime import datetime
 
-logger = logging.getLogger(__name__)
-
+from .spec_parser import build_endpoint_index
+from .utils import RESULTS_STREAM_ENV, json_dumps, sanitize_identifier, write_files
 
-class TestGenerator:
-    """Generate pytest test files from test scenarios"""
-    
-    def __init__(self, config: Dict):
-        """Initialize test generator"""
-        self.config = config
-        self.output_dir = Path(config.get('output_directory', 'generated_tests'))
-        self.output_dir.mkdir(exist_ok=True, parents=True)
-    
-    def generate_tests(self, spec_data: Dict, analysis: Dict) -> List[str]:
-        """
-        Generate pytest test files
-        
-        Args:
-            spec_data: Parsed OpenAPI spec
-            analysis: AI analysis results
-            
-        Returns:
-            List of generated test file paths
-        """
-        logger.info("Generating pytest test files...")
-        
-        # ADDITION: Clean old test files before generating new ones
-        if self.output_dir.exists():
-            logger.debug(f"Cleaning old test files from {self.output_dir}")
-            for old_file in self.output_dir.glob('test_*.py'):
-                old_file.unlink()
-                logger.debug(f"Removed old test file: {old_file}")        
-        # Create output directory
-        self.output_dir.mkdir(exist_ok=True, parents=True)
+logger = logging.getLogger(__name__)
 
-        # Group scenarios by endpoint
-        grouped = self._group_scenarios_by_endpoint(analysis['test_scenarios'])
-        
-        # ADDING THESE DEBUG LINES:
-        logger.info(f"Grouped into {len(grouped)} unique endpoints")
-        for endpoint, scenarios in grouped.items():
-            logger.info(f"  {endpoint}: {len(scenarios)} scenarios")
 
-        generated_files = []
-        
-        # Generate conftest.py for shared fixtures
-        conftest_path = self._generate_conftest(spec_data)
-        generated_files.append(str(conftest_path))
-        
-        # Generate test file for each endpoint group
-        for endpoint, scenarios in grouped.items():
-            test_file = self._generate_test_file(endpoint, scenarios, spec_data)
-            generated_files.append(str(test_file))
-        
-        logger.info(f"Generated {len(generated_files)} test files")
-        return generated_files
-    
-    def _group_scenarios_by_endpoint(self, scenarios: List[Dict]) -> Dict[str, List[Dict]]:
-        """Group test scenarios by endpoint"""
-        grouped = {}
-        
-        for scenario in scenarios:
-            endpoint = scenario['endpoint']
-            if endpoint not in grouped:
-                grouped[endpoint] = []
-            grouped[endpoint].append(scenario)
-        
-        return grouped
-    
-    def _generate_conftest(self, spec_data: Dict) -> Path:
-        """Generate conftest.py with shared fixtures"""
-        
-        content = f'''"""
+# Source templates for generated files, parsed once at import time and filled in
+# with str.format (literal braces in the generated code are doubled)
+_CONFTEST_TEMPLATE = '''"""
 Pytest configuration and shared fixtures
-Auto-generated on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+Auto-generated on {generated_at}
 """
 
+import json
 import pytest
 import requests
 import os
-from typing import Dict, Any
+from requests.adapters import HTTPAdapter
+from typing import Any, Callable, Dict
+
+
+# Per-test results stream, read by the test executor while the suite runs
+_RESULTS_STREAM = os.getenv("{results_stream_env}")
+
+
+def pytest_runtest_logreport(report):
+    """Append one JSON line per finished test (controller process only under xdist)"""
+    if not _RESULTS_STREAM or os.getenv("PYTEST_XDIST_WORKER"):
+        return
+    # One record per test: the call phase, or setup when it failed/skipped
+    if report.when != "call" and not (report.when == "setup" and not report.passed):
+        return
+    
+    record = {{
+        "nodeid": report.nodeid,
+        "outcome": "error" if report.when == "setup" and report.failed else report.outcome,
+        "duration": report.duration,
+        "location": [report.location[0], report.location[1] or 0],
+        "longrepr": str(report.longrepr) if report.failed else None,
+    }}
+    with open(_RESULTS_STREAM, "a", encoding="utf-8") as fh:
+        fh.write(json.dumps(record) + "\\n")
 
 
 @pytest.fixture(scope="session")
 def api_config() -> Dict[str, Any]:
     """Load API configuration"""
     return {{
-        "base_url": "{spec_data['servers'][0]['url'] if spec_data['servers'] else 'http://localhost'}",
+        "base_url": "{base_url}",
         "timeout": 30,
         "verify_ssl": True
     }}
@@ -118,9 +80,9 @@ def auth_headers() -> Dict[str, str]:
     return headers
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def api_client(api_config, auth_headers):
-    """Create configured API client"""
+    """Create configured API client (one per session/worker, so connections are reused)"""
     class APIClient:
         def __init__(self, base_url: str, headers: Dict[str, str], timeout: int):
             self.base_url = base_url.rstrip('/')
@@ -128,6 +90,11 @@ def api_client(api_config, auth_headers):
             self.timeout = timeout
             self.session = requests.Session()
             self.session.headers.update(headers)
+            
+            # Keep-alive pool shared by every test in this session
+            adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32)
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
         
         def request(self, method: str, path: str, **kwargs) -> requests.Response:
             """Make HTTP request"""
@@ -150,11 +117,28 @@ def api_client(api_config, auth_headers):
         def delete(self, path: str, **kwargs) -> requests.Response:
             return self.request('DELETE', path, **kwargs)
     
-    return APIClient(
+    client = APIClient(
         base_url=api_config["base_url"],
         headers=auth_headers,
         timeout=api_config["timeout"]
     )
+    yield client
+    client.session.close()
+
+
+def cached_value(request, key: str, factory: Callable[[], Any]) -> Any:
+    """
+    Memoize an expensive JSON-serializable value (e.g. seed data) in pytest's cache
+
+    Values persist in .pytest_cache across runs and xdist workers;
+    clear them with `pytest --cache-clear`.
+    """
+    cache_key = f"api_tests/{{key}}"
+    value = request.config.cache.get(cache_key, None)
+    if value is None:
+        value = factory()
+        request.config.cache.set(cache_key, value)
+    return value
 
 
 def validate_response_schema(response_data: Any, schema: Dict) -> bool:
@@ -168,27 +152,170 @@ def assert_response_time(response: requests.Response, max_ms: int = 2000):
     response_time_ms = response.elapsed.total_seconds() * 1000
     assert response_time_ms < max_ms, f"Response time {{response_time_ms:.0f}}ms exceeds {{max_ms}}ms"
 '''
+
+_TEST_FILE_HEADER = '''"""
+Tests for {endpoint}
+Auto-generated on {generated_at}
+
+Endpoint: {method} {path}
+Description: {description}
+"""
+
+import pytest
+import requests
+from typing import Dict, Any
+
+
+class Test{class_name}:
+    """Test suite for {endpoint}"""
+    
+'''
+
+_TEST_METHOD_TEMPLATE = '''    def test_{test_name}_{index}(self, api_client):
+            """
+            {description}
+            Type: {test_type}
+            Expected Status: {expected_status}
+            """
+            # Test data
+            params = {query_params_str}
+            body = {body_str}
+            
+            # Make request
+            response = api_client.request(
+                method="{method}",
+                path="{actual_path}",
+                params=params if params else None,
+                json=body if body else None
+            )
+            
+            # Assertions
+            assert response.status_code == {expected_status}, \\
+                f"Expected status {expected_status}, got {{response.status_code}}: {{response.text}}"
+            
+    '''
+
+# Appended to test methods that expect a 2xx status
+_RESPONSE_VALIDATION = '''        
+            # Validate response structure
+            if response.status_code in [200, 201]:
+                try:
+                    response_data = response.json()
+                    assert response_data is not None, "Response body should not be empty"
+                except:
+                    pass  # Some APIs return empty bodies
+                # TODO: Add specific schema validation
+    '''
+
+
+class TestGenerator:
+    """Generate pytest test files from test scenarios"""
+    
+    def __init__(self, config: Dict):
+        """Initialize test generator"""
+        self.config = config
+        self.output_dir = Path(config.get('output_directory', 'generated_tests'))
+        self.output_dir.mkdir(exist_ok=True, parents=True)
+        self._endpoint_index: Dict = {}
+    
+    def generate_tests(self, spec_data: Dict, analysis: Dict) -> List[str]:
+        """
+        Generate pytest test files
         
-        conftest_path = self.output_dir / "conftest.py"
-        conftest_path.write_text(content)
-        logger.debug(f"Generated conftest.py: {conftest_path}")
+        Args:
+            spec_data: Parsed OpenAPI spec
+            analysis: AI analysis results
+            
+        Returns:
+            List of generated test file paths
+        """
+        logger.info("Generating pytest test files...")
         
-        return conftest_path
+        # ADDITION: Clean old test files before generating new ones
+        # (only generated test_*.py files; anything else in the directory is kept)
+        if self.output_dir.exists():
+            removed = self._remove_old_test_files()
+            logger.debug(f"Removed {removed} old test files from {self.output_dir}")
+        # Create output directory
+        self.output_dir.mkdir(exist_ok=True, parents=True)
+
+        # (METHOD, path) -> endpoint, so each test file looks up its endpoint in O(1)
+        self._endpoint_index = build_endpoint_index(spec_data['endpoints'])
+        
+        # Group scenarios by endpoint
+        grouped = self._group_scenarios_by_endpoint(analysis['test_scenarios'])
+        
+        # ADDING THESE DEBUG LINES:
+        logger.info(f"Grouped into {len(grouped)} unique endpoints")
+        for endpoint, scenarios in grouped.items():
+            logger.info(f"  {endpoint}: {len(scenarios)} scenarios")
+
+        # One timestamp for the whole run rather than one per file
+        generated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        
+        # Render every file first, then write them in one batch
+        # conftest.py for shared fixtures
+        pending = [self._generate_conftest(spec_data, generated_at)]
+        
+        # Test file for each endpoint group
+        for endpoint, scenarios in grouped.items():
+            pending.append(self._generate_test_file(endpoint, scenarios, spec_data, generated_at))
+        
+        generated_files = []
+        for path in write_files(pending):
+            logger.debug(f"Generated test file: {path}")
+            generated_files.append(str(path))
+        
+        logger.info(f"Generated {len(generated_files)} test files")
+        return generated_files
+    
+    def _remove_old_test_files(self) -> int:
+        """Delete previously generated test_*.py files in one directory pass"""
+        removed = 0
+        with os.scandir(self.output_dir) as entries:
+            for entry in entries:
+                name = entry.name
+                if name.startswith('test_') and name.endswith('.py') and entry.is_file(follow_symlinks=False):
+                    os.unlink(entry.path)
+                    removed += 1
+        return removed
     
-    def _generate_test_file(self, endpoint: str, scenarios: List[Dict], spec_data: Dict) -> Path:
-        """Generate test file for an endpoint"""
+    def _group_scenarios_by_endpoint(self, scenarios: List[Dict]) -> Dict[str, List[Dict]]:
+        """Group test scenarios by endpoint"""
+        grouped = {}
+        
+        for scenario in scenarios:
+            endpoint = scenario['endpoint']
+            if endpoint not in grouped:
+                grouped[endpoint] = []
+            grouped[endpoint].append(scenario)
+        
+        return grouped
+    
+    def _generate_conftest(self, spec_data: Dict, generated_at: str) -> Tuple[Path, str]:
+        """Render conftest.py with shared fixtures; returns (path, content)"""
+        
+        base_url = spec_data['servers'][0]['url'] if spec_data['servers'] else 'http://localhost'
+        content = _CONFTEST_TEMPLATE.format(
+            generated_at=generated_at,
+            results_stream_env=RESULTS_STREAM_ENV,
+            base_url=base_url
+        )
+        
+        return self.output_dir / "conftest.py", content
+    
+    def _generate_test_file(self, endpoint: str, scenarios: List[Dict], spec_data: Dict,
+                            generated_at: str) -> Tuple[Path, str]:
+        """Render the test file for an endpoint; returns (path, content)"""
         
         # Create safe filename
         filename = self._endpoint_to_filename(endpoint)
         filepath = self.output_dir / f"test_{filename}.py"
         
         # Generate file content
-        content = self._generate_test_content(endpoint, scenarios, spec_data)
-        
-        filepath.write_text(content)
-        logger.debug(f"Generated test file: {filepath}")
+        content = self._generate_test_content(endpoint, scenarios, spec_data, generated_at)
         
-        return filepath
+        return filepath, content
     
     def _endpoint_to_filename(self, endpoint: str) -> str:
         """Convert endpoint to valid filename"""
@@ -213,7 +340,8 @@ def assert_response_time(response: requests.Response, max_ms: int = 2000):
         else:
             return f"{method_lower}_root"
     
-    def _generate_test_content(self, endpoint: str, scenarios: List[Dict], spec_data: Dict) -> str:
+    def _generate_test_content(self, endpoint: str, scenarios: List[Dict], spec_data: Dict,
+                               generated_at: str) -> str:
         """Generate test file content"""
         
         # Extract method and path
@@ -222,32 +350,24 @@ def assert_response_time(response: requests.Response, max_ms: int = 2000):
         path = parts[1] if len(parts) == 2 else endpoint
         
         # Find endpoint details in spec
-        endpoint_details = self._find_endpoint_details(method, path, spec_data)
-        
-        content = f'''"""
-Tests for {endpoint}
-Auto-generated on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-
-Endpoint: {method} {path}
-Description: {endpoint_details.get('description', 'N/A')}
-"""
-
-import pytest
-import requests
-from typing import Dict, Any
-
-
-class Test{self._class_name_from_endpoint(endpoint)}:
-    """Test suite for {endpoint}"""
-    
-'''
-        
-        # Generate test methods
+        endpoint_details = self._find_endpoint_details(method, path)
+        
+        content = _TEST_FILE_HEADER.format(
+            endpoint=endpoint,
+            generated_at=generated_at,
+            method=method,
+            path=path,
+            description=endpoint_details.get('description', 'N/A'),
+            class_name=self._class_name_from_endpoint(endpoint)
+        )
+        
+        # Generate test methods (joined once instead of growing the string per scenario)
+        parts = [content]
         for i, scenario in enumerate(scenarios, 1):
-            content += self._generate_test_method(scenario, method, path, i)
-            content += '\n'
+            parts.append(self._generate_test_method(scenario, method, path, i))
+            parts.append('\n')
         
-        return content
+        return ''.join(parts)
     
     def _class_name_from_endpoint(self, endpoint: str) -> str:
         """Generate class name from endpoint"""
@@ -259,11 +379,12 @@ class Test{self._class_name_from_endpoint(endpoint)}:
     def _generate_test_method(self, scenario: Dict, method: str, path: str, index: int) -> str:
         """Generate individual test method"""
         
-        test_name = self._sanitize_test_name(scenario.get('scenario_name', f'test_{index}'))
-        description = scenario.get('description', '')
-        test_type = scenario.get('test_type', 'positive')
-        expected_status = scenario.get('expected_status', 200)
-        test_data = scenario.get('test_data', {})
+        get = scenario.get
+        test_name = self._sanitize_test_name(get('scenario_name', f'test_{index}'))
+        description = get('description', '')
+        test_type = get('test_type', 'positive')
+        expected_status = get('expected_status', 200)
+        test_data = get('test_data', {})
         
         # Convert JSON nulls to Python None
         params = test_data.get('parameters', {})
@@ -289,64 +410,40 @@ class Test{self._class_name_from_endpoint(endpoint)}:
         body_str = self._convert_to_python_literal(body)
         
         # Build test method
-        method_code = f'''    def test_{test_name}_{index}(self, api_client):
-            """
-            {description}
-            Type: {test_type}
-            Expected Status: {expected_status}
-            """
-            # Test data
-            params = {query_params_str}
-            body = {body_str}
-            
-            # Make request
-            response = api_client.request(
-                method="{method}",
-                path="{actual_path}",
-                params=params if params else None,
-                json=body if body else None
-            )
-            
-            # Assertions
-            assert response.status_code == {expected_status}, \\
-                f"Expected status {expected_status}, got {{response.status_code}}: {{response.text}}"
-            
-    '''
+        method_code = [_TEST_METHOD_TEMPLATE.format(
+            test_name=test_name,
+            index=index,
+            description=description,
+            test_type=test_type,
+            expected_status=expected_status,
+            query_params_str=query_params_str,
+            body_str=body_str,
+            method=method,
+            actual_path=actual_path
+        )]
         
         # Add additional assertions
-        assertions = scenario.get('assertions', [])
+        assertions = get('assertions', [])
         if assertions:
-            method_code += '        # Additional assertions\n'
-            for assertion in assertions[:3]:
-                method_code += f'        # TODO: {assertion}\n'
+            method_code.append('        # Additional assertions\n')
+            method_code.extend(f'        # TODO: {assertion}\n' for assertion in assertions[:3])
         
         # Add response validation for successful responses
         if expected_status >= 200 and expected_status < 300:
-            method_code += '''        
-            # Validate response structure
-            if response.status_code in [200, 201]:
-                try:
-                    response_data = response.json()
-                    assert response_data is not None, "Response body should not be empty"
-                except:
-                    pass  # Some APIs return empty bodies
-                # TODO: Add specific schema validation
-    '''
+            method_code.append(_RESPONSE_VALIDATION)
         
-        method_code += '\n'
+        method_code.append('\n')
         
-        return method_code
+        return ''.join(method_code)
 
     # Added method to handle changes needed from JSON -> Python
     def _convert_to_python_literal(self, obj) -> str:
         """Convert JSON object to Python literal string, handling null -> None"""
-        import json
-        
         if obj is None or obj == {}:
             return "{}"
         
-        # Convert to JSON string first
-        json_str = json.dumps(obj, indent=8)
+        # Convert to JSON string first (orjson when installed)
+        json_str = json_dumps(obj, indent=True)
         
         # Replace JSON literals with Python equivalents
         json_str = json_str.replace('null', 'None')
@@ -360,19 +457,11 @@ class Test{self._class_name_from_endpoint(endpoint)}:
     
     def _sanitize_test_name(self, name: str) -> str:
         """Convert scenario name to valid Python identifier"""
-        # Remove special characters, replace spaces with underscores
-        name = ''.join(c if c.isalnum() or c == '_' else '_' for c in name.lower())
-        # Remove duplicate underscores
-        while '__' in name:
-            name = name.replace('__', '_')
-        return name.strip('_')
+        return sanitize_identifier(name)
     
-    def _find_endpoint_details(self, method: str, path: str, spec_data: Dict) -> Dict:
-        """Find endpoint details in spec data"""
-        for endpoint in spec_data['endpoints']:
-            if endpoint['method'] == method.upper() and endpoint['path'] == path:
-                return endpoint
-        return {}
+    def _find_endpoint_details(self, method: str, path: str) -> Dict:
+        """Find endpoint details in the spec index built by generate_tests"""
+        return self._endpoint_index.get((method.upper(), path), {})
 
 
 def format_test_summary(generated_files: List[str]) -> str:
@@ -2,15 +2,59 @@
 Utility functions
 """
 
+import atexit
+import json
 import logging
+import os
+import queue
+import re
+import shlex
 import sys
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from typing import Optional
+from typing import Any, Iterable, List, Optional, Tuple, Union
 from colorama import init, Fore, Style
 
+try:
+    import orjson
+except ImportError:  # optional speedup, falls back to stdlib json
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # optional, cache blobs fall back to zlib
+    zstandard = None
+
+# Runs of underscores left by character filtering, collapsed to one
+_UNDERSCORE_RE = re.compile(r'_{2,}')
+
+# safe_filename's character filter for ASCII input (keeps alphanumerics, '-' and '_')
+_FILENAME_TABLE = str.maketrans({
+    c: '_' for c in map(chr, range(128)) if not (c.isalnum() or c in '-_')
+})
+
+# sanitize_identifier's character filter for ASCII input (keeps alphanumerics and '_')
+_IDENTIFIER_TABLE = str.maketrans({
+    c: '_' for c in map(chr, range(128)) if not (c.isalnum() or c == '_')
+})
+
+# Suffix for files written with compress_bytes(), so a codec change is a cache miss
+CACHE_SUFFIX = '.zst' if zstandard is not None else '.zz'
+
+# Environment variable naming the JSON-lines file the generated conftest appends
+# one record per finished test to (read progressively by TestExecutor)
+RESULTS_STREAM_ENV = 'API_TESTS_RESULTS_STREAM'
+
 # Initialize colorama
 init(autoreset=True)
 
+logger = logging.getLogger(__name__)
+
 
 def setup_logging(verbose: bool = False) -> logging.Logger:
     """
@@ -48,11 +92,20 @@ def setup_logging(verbose: bool = False) -> logging.Logger:
     file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(formatter)
     
-    # Configure root logger
+    # File writes go through a queue drained by a listener thread; the console
+    # handler stays synchronous so log lines and direct stdout writes (banner,
+    # summary) keep their order
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    
+    # Configure root logger. The queue handler goes first: it enqueues a copy of
+    # the record before ColoredFormatter rewrites record.levelname in place.
     root_logger = logging.getLogger()
     root_logger.setLevel(level)
+    root_logger.addHandler(QueueHandler(log_queue))
     root_logger.addHandler(console_handler)
-    root_logger.addHandler(file_handler)
     
     # Reduce noise from third-party libraries
     logging.getLogger('urllib3').setLevel(logging.WARNING)
@@ -79,6 +132,65 @@ class ColoredFormatter(logging.Formatter):
         return super().format(record)
 
 
+class RateLimiter:
+    """Thread-safe sliding-window limiter for requests and tokens per minute"""
+    
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None, window: float = 60.0):
+        """
+        Args:
+            rpm: Maximum requests per window (None/0 = unlimited)
+            tpm: Maximum tokens per window (None/0 = unlimited)
+            window: Window length in seconds
+        """
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = window
+        self._events = deque()  # (timestamp, tokens) of requests inside the window
+        self._tokens = 0
+        self._lock = threading.Lock()
+    
+    def _try_acquire(self, tokens: int) -> float:
+        """Record a request if it fits the window, else return seconds to wait"""
+        with self._lock:
+            now = time.monotonic()
+            events = self._events
+            
+            # Drop requests that have left the window
+            while events and now - events[0][0] >= self.window:
+                self._tokens -= events.popleft()[1]
+            
+            over_rpm = bool(self.rpm) and len(events) >= self.rpm
+            # A single oversized request is still let through once the window is empty
+            over_tpm = bool(self.tpm) and bool(events) and self._tokens + tokens > self.tpm
+            
+            if not (over_rpm or over_tpm):
+                events.append((now, tokens))
+                self._tokens += tokens
+                return 0.0
+            
+            return max(events[0][0] + self.window - now, 0.01)
+    
+    def acquire(self, tokens: int = 0):
+        """Block until a request using `tokens` tokens fits within the limits"""
+        while True:
+            delay = self._try_acquire(tokens)
+            if delay <= 0:
+                return
+            logger.debug(f"Rate limit reached, waiting {delay:.1f}s")
+            time.sleep(delay)
+    
+    async def acquire_async(self, tokens: int = 0):
+        """Async variant of acquire() that yields to the event loop while waiting"""
+        import asyncio
+        
+        while True:
+            delay = self._try_acquire(tokens)
+            if delay <= 0:
+                return
+            logger.debug(f"Rate limit reached, waiting {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
 def print_banner():
     """Print application banner"""
     banner = f"""
@@ -95,25 +207,34 @@ def format_duration(seconds: float) -> str:
     if seconds < 60:
         return f"{seconds:.2f}s"
     elif seconds < 3600:
-        minutes = int(seconds // 60)
-        secs = seconds % 60
-        return f"{minutes}m {secs:.1f}s"
+        minutes, secs = divmod(seconds, 60)
+        return f"{int(minutes)}m {secs:.1f}s"
     else:
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        return f"{hours}h {minutes}m"
+        hours, rest = divmod(seconds, 3600)
+        return f"{int(hours)}h {int(rest // 60)}m"
 
 
 def safe_filename(name: str) -> str:
     """Convert string to safe filename"""
-    # Remove/replace unsafe characters
-    safe = ''.join(c if c.isalnum() or c in (' ', '-', '_') else '_' for c in name)
-    # Replace spaces with underscores
-    safe = safe.replace(' ', '_')
-    # Remove duplicate underscores
-    while '__' in safe:
-        safe = safe.replace('__', '_')
-    return safe.strip('_').lower()
+    # Remove/replace unsafe characters, replacing spaces with underscores
+    if name.isascii():
+        safe = name.translate(_FILENAME_TABLE)
+    else:
+        safe = ''.join(c if c.isalnum() or c in ('-', '_') else '_' for c in name)
+    # Collapse runs of underscores
+    return _UNDERSCORE_RE.sub('_', safe).strip('_').lower()
+
+
+def sanitize_identifier(name: str) -> str:
+    """Convert string to a lowercase identifier fragment (alphanumerics and single underscores)"""
+    # Remove special characters, replace spaces with underscores
+    name = name.lower()
+    if name.isascii():
+        name = name.translate(_IDENTIFIER_TABLE)
+    else:
+        name = ''.join(c if c.isalnum() or c == '_' else '_' for c in name)
+    # Collapse runs of underscores
+    return _UNDERSCORE_RE.sub('_', name).strip('_')
 
 
 def truncate_string(s: str, max_length: int = 100, suffix: str = '...') -> str:
@@ -136,22 +257,123 @@ def ensure_dir(path: Path) -> Path:
     return path
 
 
+def atomic_write_bytes(path: Path, data: bytes) -> Path:
+    """Write bytes via a temp file + rename so readers never see a partial file"""
+    ensure_dir(path.parent)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+    return path
+
+
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+
+
+def _write_file(item: Tuple[Path, str]) -> Path:
+    """Write one UTF-8 text file with a single open/write/close"""
+    path, content = item
+    view = memoryview(content.encode('utf-8'))
+    fd = os.open(path, _WRITE_FLAGS, 0o644)
+    try:
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+    return path
+
+
+def write_files(files: Iterable[Tuple[Path, str]]) -> List[Path]:
+    """
+    Write a batch of UTF-8 text files, concurrently when there are several
+    
+    File writes release the GIL, so a small thread pool overlaps them.
+    
+    Args:
+        files: (path, content) pairs; parent directories must exist
+        
+    Returns:
+        Written paths, in input order
+    """
+    files = list(files)
+    if len(files) <= 1:
+        return [_write_file(item) for item in files]
+    
+    workers = min(32, (os.cpu_count() or 1) * 4, len(files))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_write_file, files))
+
+
+def compress_bytes(data: bytes) -> bytes:
+    """Compress a cache payload with zstd (level 3) when installed, else zlib"""
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return zlib.compress(data, 6)
+
+
+def decompress_bytes(data: bytes) -> bytes:
+    """Inverse of compress_bytes()"""
+    if zstandard is not None:
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def json_loads(data: Union[str, bytes]) -> Any:
+    """Decode JSON using orjson when installed (errors are json.JSONDecodeError either way)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj: Any, indent: bool = False) -> str:
+    """Encode JSON compactly (or with 2-space indent) using orjson when installed"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option).decode('utf-8')
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+
+
+_BYTE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+
+
 def format_bytes(bytes_count: int) -> str:
     """Format bytes in human-readable format"""
-    for unit in ['B', 'KB', 'MB', 'GB']:
-        if bytes_count < 1024.0:
-            return f"{bytes_count:.1f} {unit}"
-        bytes_count /= 1024.0
-    return f"{bytes_count:.1f} TB"
+    if bytes_count < 1024:
+        return f"{bytes_count:.1f} B"
+    # Each unit is 2**10 of the previous one, so the bit length picks it directly
+    exponent = min((int(bytes_count).bit_length() - 1) // 10, len(_BYTE_UNITS) - 1)
+    return f"{bytes_count / (1 << (10 * exponent)):.1f} {_BYTE_UNITS[exponent]}"
+
+
+def _curl_method(result: dict, value: str):
+    """Apply -X/--request"""
+    result['method'] = value
+
+
+def _curl_header(result: dict, value: str):
+    """Apply -H/--header ("Name: value")"""
+    if ':' in value:
+        key, value = value.split(':', 1)
+        result['headers'][key.strip()] = value.strip()
+
+
+def _curl_data(result: dict, value: str):
+    """Apply -d/--data"""
+    result['data'] = value
+
+
+# curl options that take a value, mapped to the handler that applies it
+_CURL_OPTIONS = {
+    '-X': _curl_method, '--request': _curl_method,
+    '-H': _curl_header, '--header': _curl_header,
+    '-d': _curl_data, '--data': _curl_data,
+}
 
 
 def parse_curl_command(curl_cmd: str) -> dict:
     """Parse curl command into request components (basic implementation)"""
     # This is a simplified parser - full implementation would be more complex
-    import shlex
-    
-    parts = shlex.split(curl_cmd)
-    
     result = {
         'method': 'GET',
         'url': '',
@@ -159,28 +381,17 @@ def parse_curl_command(curl_cmd: str) -> dict:
         'data': None
     }
     
-    i = 0
-    while i < len(parts):
-        if parts[i] == 'curl':
-            i += 1
+    tokens = iter(shlex.split(curl_cmd))
+    for token in tokens:
+        if token == 'curl':
             continue
         
-        if parts[i] in ('-X', '--request'):
-            result['method'] = parts[i + 1]
-            i += 2
-        elif parts[i] in ('-H', '--header'):
-            header = parts[i + 1]
-            if ':' in header:
-                key, value = header.split(':', 1)
-                result['headers'][key.strip()] = value.strip()
-            i += 2
-        elif parts[i] in ('-d', '--data'):
-            result['data'] = parts[i + 1]
-            i += 2
-        elif not parts[i].startswith('-'):
-            result['url'] = parts[i].strip("'\"")
-            i += 1
-        else:
-            i += 1
-    
-    return result
\ No newline at end of file
+        handler = _CURL_OPTIONS.get(token)
+        if handler is not None:
+            value = next(tokens, None)
+            if value is not None:
+                handler(result, value)
+        elif not token.startswith('-'):
+            result['url'] = token.strip("'\"")
+    
+    return result